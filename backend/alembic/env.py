@@ -10,7 +10,7 @@ from alembic import context
 # Import your models and config
 from app.database import Base
 from app.config import get_settings
-from app.models import User, URL, Analytics  # noqa: F401
+from app.models import User, URL, Analytics, URLClickShard, URLDailyStats, URLHourlyStats, URLDailyFacet, UserAgent, Referrer  # noqa: F401
 
 # this is the Alembic Config object
 config = context.config
@@ -0,0 +1,38 @@
+"""Add url_click_shards for hot link click counters
+
+Revision ID: 004_url_click_shards
+Revises: f74ebc4bd48b
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '004_url_click_shards'
+down_revision: Union[str, None] = 'f74ebc4bd48b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'url_click_shards',
+        sa.Column('url_id', sa.BigInteger(), nullable=False),
+        sa.Column('shard', sa.SmallInteger(), nullable=False),
+        sa.Column('clicks', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.ForeignKeyConstraint(['url_id'], ['urls.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('url_id', 'shard'),
+    )
+
+
+def downgrade() -> None:
+    # Fold sharded clicks back into the URL rows before dropping them
+    op.execute("""
+        UPDATE urls SET click_count = urls.click_count + s.clicks
+        FROM (SELECT url_id, SUM(clicks) AS clicks FROM url_click_shards GROUP BY url_id) AS s
+        WHERE urls.id = s.url_id
+    """)
+    op.drop_table('url_click_shards')
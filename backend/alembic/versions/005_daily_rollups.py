@@ -0,0 +1,63 @@
+"""Add url_daily_stats / url_daily_facets analytics rollups
+
+Revision ID: 005_daily_rollups
+Revises: 004_url_click_shards
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '005_daily_rollups'
+down_revision: Union[str, None] = '004_url_click_shards'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DAY = "(timestamp AT TIME ZONE 'UTC')::date"
+# Same host extraction as urllib's hostname, used for the referrer facet
+REFERRER_HOST = r"lower(substring(referrer from '^[A-Za-z][A-Za-z0-9+.-]*://(?:[^@/?#]*@)?([^/:?#]+)'))"
+
+
+def upgrade() -> None:
+    op.create_table(
+        'url_daily_stats',
+        sa.Column('url_id', sa.BigInteger(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('clicks', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.ForeignKeyConstraint(['url_id'], ['urls.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('url_id', 'day'),
+    )
+    op.create_table(
+        'url_daily_facets',
+        sa.Column('url_id', sa.BigInteger(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('dimension', sa.String(length=16), nullable=False),
+        sa.Column('value', sa.Text(), nullable=False),
+        sa.Column('clicks', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.ForeignKeyConstraint(['url_id'], ['urls.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('url_id', 'day', 'dimension', 'value'),
+    )
+
+    # Backfill from the raw clicks
+    op.execute(f"""
+        INSERT INTO url_daily_stats (url_id, day, clicks)
+        SELECT url_id, {DAY}, count(*) FROM analytics GROUP BY 1, 2
+    """)
+    facets = [(name, name) for name in ("device", "browser", "os", "country")]
+    facets.append(("referrer", REFERRER_HOST))
+    for dimension, expression in facets:
+        op.execute(f"""
+            INSERT INTO url_daily_facets (url_id, day, dimension, value, clicks)
+            SELECT url_id, {DAY}, '{dimension}', {expression}, count(*)
+            FROM analytics
+            WHERE {expression} IS NOT NULL AND {expression} <> ''
+            GROUP BY 1, 2, 4
+        """)
+
+
+def downgrade() -> None:
+    op.drop_table('url_daily_facets')
+    op.drop_table('url_daily_stats')
@@ -0,0 +1,55 @@
+"""Add HyperLogLog visitor sketches to url_daily_stats
+
+Revision ID: 006_visitor_sketches
+Revises: 005_daily_rollups
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.config import get_settings
+from app.utils.hyperloglog import HyperLogLog
+
+
+# revision identifiers, used by Alembic.
+revision: str = '006_visitor_sketches'
+down_revision: Union[str, None] = '005_daily_rollups'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+
+def upgrade() -> None:
+    op.add_column('url_daily_stats', sa.Column('visitor_sketch', sa.LargeBinary(), nullable=True))
+
+    # Build a sketch per (url, day) from the distinct IPs already recorded
+    precision = get_settings().hll_precision
+    conn = op.get_bind()
+    rows = conn.execution_options(stream_results=True, yield_per=BATCH_SIZE).execute(sa.text("""
+        SELECT url_id, (timestamp AT TIME ZONE 'UTC')::date AS day,
+               array_agg(DISTINCT ip_address) AS ips
+        FROM analytics
+        WHERE ip_address IS NOT NULL
+        GROUP BY 1, 2
+    """))
+    update = sa.text(
+        "UPDATE url_daily_stats SET visitor_sketch = :sketch WHERE url_id = :url_id AND day = :day"
+    )
+    batch = []
+    for url_id, day, ips in rows:
+        sketch = HyperLogLog(precision)
+        for ip in ips:
+            sketch.add(ip)
+        batch.append({"url_id": url_id, "day": day, "sketch": sketch.to_bytes()})
+        if len(batch) >= BATCH_SIZE:
+            conn.execute(update, batch)
+            batch = []
+    if batch:
+        conn.execute(update, batch)
+
+
+def downgrade() -> None:
+    op.drop_column('url_daily_stats', 'visitor_sketch')
@@ -0,0 +1,52 @@
+"""Add per-URL, time-range and facet indexes to analytics
+
+Revision ID: 007_analytics_indexes
+Revises: 006_visitor_sketches
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '007_analytics_indexes'
+down_revision: Union[str, None] = '006_visitor_sketches'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction; building the
+    # indexes this way doesn't block click ingestion on a large table.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_analytics_url_id_timestamp', 'analytics', ['url_id', 'timestamp'],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            'ix_analytics_timestamp_brin', 'analytics', ['timestamp'],
+            postgresql_using='brin', postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            'ix_analytics_url_id_country', 'analytics', ['url_id', 'country'],
+            postgresql_where=sa.text('country IS NOT NULL'),
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            'ix_analytics_url_id_device', 'analytics', ['url_id', 'device'],
+            postgresql_where=sa.text('device IS NOT NULL'),
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name in (
+            'ix_analytics_url_id_device',
+            'ix_analytics_url_id_country',
+            'ix_analytics_timestamp_brin',
+            'ix_analytics_url_id_timestamp',
+        ):
+            op.drop_index(name, table_name='analytics', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,134 @@
+"""Partition analytics by month on timestamp
+
+Revision ID: 008_partition_analytics
+Revises: 007_analytics_indexes
+Create Date: 2026-10-17
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.config import get_settings
+from app.services.analytics_partitions import (
+    DEFAULT_PARTITION,
+    add_months,
+    create_partition_sql,
+    month_start,
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = '008_partition_analytics'
+down_revision: Union[str, None] = '007_analytics_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = "id, url_id, timestamp, ip_address, user_agent, country, city, device, browser, os, referrer"
+INDEXES = (
+    'ix_analytics_url_id_timestamp',
+    'ix_analytics_timestamp_brin',
+    'ix_analytics_url_id_country',
+    'ix_analytics_url_id_device',
+)
+# analytics_old ids copied per transaction
+BATCH_SIZE = 50_000
+
+
+def _columns() -> list[sa.Column]:
+    return [
+        sa.Column('id', sa.BigInteger(), server_default=sa.text("nextval('analytics_id_seq')"), nullable=False),
+        sa.Column('url_id', sa.BigInteger(), sa.ForeignKey('urls.id'), nullable=False),
+        sa.Column('timestamp', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('ip_address', sa.String(45), nullable=True),
+        sa.Column('user_agent', sa.Text(), nullable=True),
+        sa.Column('country', sa.String(100), nullable=True),
+        sa.Column('city', sa.String(100), nullable=True),
+        sa.Column('device', sa.String(50), nullable=True),
+        sa.Column('browser', sa.String(50), nullable=True),
+        sa.Column('os', sa.String(50), nullable=True),
+        sa.Column('referrer', sa.Text(), nullable=True),
+    ]
+
+
+def _create_indexes() -> None:
+    # Plain CREATE INDEX - CONCURRENTLY isn't supported on partitioned tables
+    op.create_index('ix_analytics_url_id_timestamp', 'analytics', ['url_id', 'timestamp'])
+    op.create_index('ix_analytics_timestamp_brin', 'analytics', ['timestamp'], postgresql_using='brin')
+    op.create_index(
+        'ix_analytics_url_id_country', 'analytics', ['url_id', 'country'],
+        postgresql_where=sa.text('country IS NOT NULL'),
+    )
+    op.create_index(
+        'ix_analytics_url_id_device', 'analytics', ['url_id', 'device'],
+        postgresql_where=sa.text('device IS NOT NULL'),
+    )
+
+
+def _swap_out_old_table() -> None:
+    """Rename the current analytics table out of the way, keeping its id sequence."""
+    for name in INDEXES:
+        op.drop_index(name, table_name='analytics', if_exists=True)
+    op.rename_table('analytics', 'analytics_old')
+    op.execute("ALTER TABLE analytics_old RENAME CONSTRAINT analytics_pkey TO analytics_old_pkey")
+    op.execute("ALTER SEQUENCE analytics_id_seq OWNED BY NONE")
+
+
+def _finish_swap() -> None:
+    """
+    Index the new (empty) table, then copy analytics_old into it.
+
+    The swap commits first, so clicks go to the new table while the history
+    is copied in id-range batches of one short transaction each. Nothing
+    writes to analytics_old any more, so a single pass covers it.
+    """
+    _create_indexes()
+    conn = op.get_bind()
+    low, high = conn.execute(sa.text("SELECT min(id), max(id) FROM analytics_old")).one()
+    copy = sa.text(
+        f"INSERT INTO analytics ({COLUMNS}) SELECT {COLUMNS} FROM analytics_old "
+        "WHERE id >= :start AND id < :end"
+    )
+    with op.get_context().autocommit_block():
+        if low is not None:
+            for start in range(low, high + 1, BATCH_SIZE):
+                conn.execute(copy, {"start": start, "end": start + BATCH_SIZE})
+    op.drop_table('analytics_old')
+    op.execute("ALTER SEQUENCE analytics_id_seq OWNED BY analytics.id")
+    op.execute("ANALYZE analytics")
+
+
+def upgrade() -> None:
+    _swap_out_old_table()
+    op.create_table(
+        'analytics',
+        *_columns(),
+        sa.PrimaryKeyConstraint('id', 'timestamp', name='analytics_pkey'),
+        postgresql_partition_by='RANGE (timestamp)',
+    )
+
+    # One partition per month from the oldest click through the months the
+    # partition manager would create ahead of time
+    conn = op.get_bind()
+    oldest = conn.execute(sa.text("SELECT min(timestamp) FROM analytics_old")).scalar()
+    current = month_start(datetime.now(timezone.utc))
+    month = month_start(oldest.astimezone(timezone.utc)) if oldest else current
+    last = add_months(current, get_settings().analytics_partition_months_ahead)
+    while month <= last:
+        op.execute(create_partition_sql(month))
+        month = add_months(month, 1)
+    op.execute(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF analytics DEFAULT")
+
+    _finish_swap()
+
+
+def downgrade() -> None:
+    _swap_out_old_table()
+    op.create_table(
+        'analytics',
+        *_columns(),
+        sa.PrimaryKeyConstraint('id', name='analytics_pkey'),
+    )
+    # Copied before the partitions are dropped along with analytics_old
+    _finish_swap()
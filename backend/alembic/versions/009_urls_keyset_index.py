@@ -0,0 +1,32 @@
+"""Add (user_id, created_at, id) index for keyset pagination of URLs
+
+Revision ID: 009_urls_keyset_index
+Revises: 008_partition_analytics
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '009_urls_keyset_index'
+down_revision: Union[str, None] = '008_partition_analytics'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_urls_user_id_created_at_id', 'urls', ['user_id', 'created_at', 'id'],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_urls_user_id_created_at_id', table_name='urls',
+            postgresql_concurrently=True, if_exists=True,
+        )
@@ -0,0 +1,42 @@
+"""Add pg_trgm indexes for URL and user search
+
+Revision ID: 010_trigram_search
+Revises: 009_urls_keyset_index
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '010_trigram_search'
+down_revision: Union[str, None] = '009_urls_keyset_index'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = (
+    ('ix_urls_original_url_trgm', 'urls', 'original_url'),
+    ('ix_urls_slug_trgm', 'urls', 'slug'),
+    ('ix_users_email_trgm', 'users', 'email'),
+    ('ix_users_name_trgm', 'users', 'name'),
+)
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # autocommit_block commits the extension before the concurrent builds
+    with op.get_context().autocommit_block():
+        for name, table, column in INDEXES:
+            op.create_index(
+                name, table, [column],
+                postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'},
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+    # pg_trgm is left installed - other objects may depend on it
@@ -0,0 +1,34 @@
+"""Add urls.created_at index for incremental slug scans
+
+Revision ID: 011_urls_created_at_index
+Revises: 010_trigram_search
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '011_urls_created_at_index'
+down_revision: Union[str, None] = '010_trigram_search'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # URL IDs are now allocated in per-worker blocks, so the slug Bloom filter
+    # finds new rows by created_at instead of by ID
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_urls_created_at', 'urls', ['created_at'],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_urls_created_at', table_name='urls',
+            postgresql_concurrently=True, if_exists=True,
+        )
@@ -0,0 +1,39 @@
+"""Add (url_id, id) index on analytics for raw exports
+
+Revision ID: 012_analytics_export_index
+Revises: 011_urls_created_at_index
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from app.services.analytics_partitions import LIST_PARTITIONS_SQL
+
+
+# revision identifiers, used by Alembic.
+revision: str = '012_analytics_export_index'
+down_revision: Union[str, None] = '011_urls_created_at_index'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX = 'ix_analytics_url_id_id'
+
+
+def upgrade() -> None:
+    # CONCURRENTLY isn't supported on a partitioned table, so build an invalid
+    # parent index, then each partition's index concurrently and attach it.
+    # The parent index becomes valid once every partition has one.
+    conn = op.get_bind()
+    partitions = list(conn.execute(LIST_PARTITIONS_SQL).scalars())
+    op.execute(f"CREATE INDEX IF NOT EXISTS {INDEX} ON ONLY analytics (url_id, id)")
+    with op.get_context().autocommit_block():
+        for partition in partitions:
+            name = f"{partition}_url_id_id_idx"
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {partition} (url_id, id)")
+            op.execute(f"ALTER INDEX {INDEX} ATTACH PARTITION {name}")
+
+
+def downgrade() -> None:
+    # Dropping the parent index drops the attached partition indexes too
+    op.drop_index(INDEX, table_name='analytics', if_exists=True)
@@ -0,0 +1,70 @@
+"""Add url_hourly_stats for time-range analytics
+
+Revision ID: 013_hourly_rollups
+Revises: 012_analytics_export_index
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '013_hourly_rollups'
+down_revision: Union[str, None] = '012_analytics_export_index'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+HOUR = "date_trunc('hour', timestamp AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'"
+# analytics ids counted per transaction by the backfill
+BATCH_SIZE = 50_000
+
+
+def _id_batches(conn, after: int | None = None) -> list[tuple[int, int]]:
+    """[start, end) id ranges covering analytics rows with id > `after`."""
+    low, high = conn.execute(
+        sa.text("SELECT min(id), max(id) FROM analytics WHERE id > coalesce(:after, -1)"),
+        {"after": after},
+    ).one()
+    if low is None:
+        return []
+    return [(start, start + BATCH_SIZE) for start in range(low, high + 1, BATCH_SIZE)]
+
+
+def upgrade() -> None:
+    op.create_table(
+        'url_hourly_stats',
+        sa.Column('url_id', sa.BigInteger(), nullable=False),
+        sa.Column('hour', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('clicks', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.ForeignKeyConstraint(['url_id'], ['urls.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('url_id', 'hour'),
+    )
+    op.create_index(
+        'ix_url_hourly_stats_hour_brin', 'url_hourly_stats', ['hour'], postgresql_using='brin'
+    )
+
+    # Backfill from the raw clicks still retained; older ranges in UTC are
+    # still served by url_daily_stats. Batches commit on their own and add to
+    # the hours earlier batches wrote; ranges are re-read until none are left,
+    # so clicks written by the previous release meanwhile are counted too.
+    conn = op.get_bind()
+    backfill = sa.text(f"""
+        INSERT INTO url_hourly_stats (url_id, hour, clicks)
+        SELECT url_id, {HOUR}, count(*) FROM analytics
+        WHERE id >= :start AND id < :end
+        GROUP BY 1, 2
+        ON CONFLICT (url_id, hour) DO UPDATE SET clicks = url_hourly_stats.clicks + excluded.clicks
+    """)
+    batches = _id_batches(conn)
+    with op.get_context().autocommit_block():
+        while batches:
+            for start, end in batches:
+                conn.execute(backfill, {"start": start, "end": end})
+            batches = _id_batches(conn, after=batches[-1][1] - 1)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_url_hourly_stats_hour_brin', table_name='url_hourly_stats')
+    op.drop_table('url_hourly_stats')
@@ -0,0 +1,118 @@
+"""Move analytics user_agent / referrer strings into dimension tables
+
+Revision ID: 014_dimension_tables
+Revises: 013_hourly_rollups
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.services.dimensions import DIMENSION_ID_SQL
+
+
+# revision identifiers, used by Alembic.
+revision: str = '014_dimension_tables'
+down_revision: Union[str, None] = '013_hourly_rollups'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (dimension table, text column, key column)
+DIMENSIONS = (
+    ('user_agents', 'user_agent', 'user_agent_id'),
+    ('referrers', 'referrer', 'referrer_id'),
+)
+# analytics ids updated per transaction by the backfill
+BATCH_SIZE = 50_000
+
+
+def _id_batches(conn, after: int | None = None) -> list[tuple[int, int]]:
+    """[start, end) id ranges covering analytics rows with id > `after`."""
+    low, high = conn.execute(
+        sa.text("SELECT min(id), max(id) FROM analytics WHERE id > coalesce(:after, -1)"),
+        {"after": after},
+    ).one()
+    if low is None:
+        return []
+    return [(start, start + BATCH_SIZE) for start in range(low, high + 1, BATCH_SIZE)]
+
+
+def _backfill(conn, statements) -> None:
+    """
+    Run `statements(start, end)` for every id range, one transaction each.
+
+    Ranges are re-read until none are left, so rows written by app servers
+    still running the previous release during the backfill are covered too.
+    """
+    batches = _id_batches(conn)
+    with op.get_context().autocommit_block():
+        while batches:
+            for start, end in batches:
+                for statement in statements(start, end):
+                    op.execute(statement)
+            batches = _id_batches(conn, after=batches[-1][1] - 1)
+
+
+def _upgrade_batch(start: int, end: int) -> list[str]:
+    statements = [
+        f"""
+        INSERT INTO {table} (id, value)
+        SELECT {DIMENSION_ID_SQL.format('value')}, value
+        FROM (
+            SELECT DISTINCT {column} AS value FROM analytics
+            WHERE id >= {start} AND id < {end} AND {column} <> ''
+        ) AS batch_values
+        ON CONFLICT (id) DO NOTHING
+        """
+        for table, column, _ in DIMENSIONS
+    ]
+    assignments = ", ".join(
+        f"{key} = CASE WHEN {column} <> '' THEN {DIMENSION_ID_SQL.format(column)} END"
+        for _, column, key in DIMENSIONS
+    )
+    statements.append(f"""
+        UPDATE analytics SET {assignments}
+        WHERE id >= {start} AND id < {end} AND (user_agent <> '' OR referrer <> '')
+    """)
+    return statements
+
+
+def _downgrade_batch(start: int, end: int) -> list[str]:
+    return [f"""
+        UPDATE analytics a SET
+            user_agent = (SELECT value FROM user_agents WHERE id = a.user_agent_id),
+            referrer = (SELECT value FROM referrers WHERE id = a.referrer_id)
+        WHERE a.id >= {start} AND a.id < {end}
+          AND (a.user_agent_id IS NOT NULL OR a.referrer_id IS NOT NULL)
+    """]
+
+
+def upgrade() -> None:
+    for table, column, key in DIMENSIONS:
+        op.create_table(
+            table,
+            sa.Column('id', sa.BigInteger(), autoincrement=False, nullable=False),
+            sa.Column('value', sa.Text(), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.add_column('analytics', sa.Column(key, sa.BigInteger(), nullable=True))
+        op.create_foreign_key(f'analytics_{key}_fkey', 'analytics', table, [key], ['id'])
+
+    # Batches commit on their own, so no long transaction locks the whole table
+    _backfill(op.get_bind(), _upgrade_batch)
+
+    for _, column, _ in DIMENSIONS:
+        op.drop_column('analytics', column)
+
+
+def downgrade() -> None:
+    for _, column, _ in DIMENSIONS:
+        op.add_column('analytics', sa.Column(column, sa.Text(), nullable=True))
+
+    _backfill(op.get_bind(), _downgrade_batch)
+
+    for table, _, key in DIMENSIONS:
+        op.drop_constraint(f'analytics_{key}_fkey', 'analytics', type_='foreignkey')
+        op.drop_column('analytics', key)
+        op.drop_table(table)
@@ -0,0 +1,187 @@
+"""Store analytics IPs as INET with a salted visitor_id
+
+Revision ID: 015_visitor_identity
+Revises: 014_dimension_tables
+Create Date: 2026-10-17
+"""
+from datetime import timedelta
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app.config import get_settings
+from app.utils import HyperLogLog, UINT64_MASK
+from app.utils.visitor import VISITOR_ID_SQL
+
+
+# revision identifiers, used by Alembic.
+revision: str = '015_visitor_identity'
+down_revision: Union[str, None] = '014_dimension_tables'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# analytics ids updated per transaction by the backfill
+BATCH_SIZE = 50_000
+# url_daily_stats rows written per statement by the sketch rebuild, which
+# runs one transaction per day
+SKETCH_BATCH_SIZE = 1000
+
+# Session-local cast that maps malformed addresses to NULL instead of failing.
+# Like `normalize_ip`, IPv4-mapped IPv6 addresses become plain IPv4.
+TRY_INET_SQL = """
+    CREATE OR REPLACE FUNCTION pg_temp.try_inet(value text) RETURNS inet AS $$
+    DECLARE
+        address inet;
+    BEGIN
+        address := host(value::inet)::inet;
+        IF address << '::ffff:0:0/96'::inet THEN
+            RETURN '0.0.0.0'::inet + (address - '::ffff:0.0.0.0'::inet);
+        END IF;
+        RETURN address;
+    EXCEPTION WHEN others THEN
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql IMMUTABLE
+"""
+
+
+def _id_batches(conn, after: int | None = None) -> list[tuple[int, int]]:
+    """[start, end) id ranges covering analytics rows with id > `after`."""
+    low, high = conn.execute(
+        sa.text("SELECT min(id), max(id) FROM analytics WHERE id > coalesce(:after, -1)"),
+        {"after": after},
+    ).one()
+    if low is None:
+        return []
+    return [(start, start + BATCH_SIZE) for start in range(low, high + 1, BATCH_SIZE)]
+
+
+def _commit() -> None:
+    """Commit the migration transaction so far; alembic opens a new one."""
+    with op.get_context().autocommit_block():
+        pass
+
+
+def _backfill(conn, statement: sa.TextClause) -> int | None:
+    """
+    Run `statement` with :start/:end for every id range, one transaction each.
+
+    Ranges are re-read until none are left, so rows written by app servers
+    still running the previous release during the backfill are covered too.
+    Returns the start of the last range run, for a final catch-up.
+    """
+    batches = _id_batches(conn)
+    last_start = None
+    with op.get_context().autocommit_block():
+        while batches:
+            for start, end in batches:
+                conn.execute(statement, {"start": start, "end": end})
+            last_start = batches[-1][0]
+            batches = _id_batches(conn, after=batches[-1][1] - 1)
+    return last_start
+
+
+def _catch_up(conn, statement: sa.TextClause, last_start: int | None) -> None:
+    """
+    Lock `analytics` against writers and run `statement` over rows written
+    since `_backfill`'s last pass. That range is redone too, for inserts that
+    took their id earlier but committed after it. The lock is held until the
+    caller commits.
+    """
+    conn.execute(sa.text("LOCK TABLE analytics IN ACCESS EXCLUSIVE MODE"))
+    after = last_start - 1 if last_start is not None else None
+    for start, end in _id_batches(conn, after=after):
+        conn.execute(statement, {"start": start, "end": end})
+
+
+def _rebuild_sketches(conn) -> None:
+    """
+    Rebuild the daily visitor sketches from visitor ids for the days still in
+    `analytics`, one day per transaction.
+
+    Each day's url_daily_stats rows are locked before its clicks are read.
+    Ingestion merges into the stored sketch under the same row locks, so clicks
+    committed while a day is rebuilt are merged into the rebuilt sketch rather
+    than overwritten by it.
+    """
+    precision = get_settings().hll_precision
+    first, last = conn.execute(sa.text(
+        "SELECT min(timestamp AT TIME ZONE 'UTC')::date, max(timestamp AT TIME ZONE 'UTC')::date "
+        "FROM analytics"
+    )).one()
+    if first is None:
+        return
+    lock = sa.text("SELECT 1 FROM url_daily_stats WHERE day = :day ORDER BY url_id FOR UPDATE")
+    visitors_of_day = sa.text("""
+        SELECT url_id, array_agg(DISTINCT visitor_id) AS visitors
+        FROM analytics
+        WHERE timestamp >= CAST(:day AS date) AT TIME ZONE 'UTC'
+          AND timestamp < (CAST(:day AS date) + 1) AT TIME ZONE 'UTC'
+          AND visitor_id IS NOT NULL
+        GROUP BY url_id
+    """)
+    update = sa.text(
+        "UPDATE url_daily_stats SET visitor_sketch = :sketch WHERE url_id = :url_id AND day = :day"
+    )
+
+    day = first
+    while day <= last:
+        _commit()
+        conn.execute(lock, {"day": day})
+        rows = conn.execution_options(stream_results=True, yield_per=SKETCH_BATCH_SIZE).execute(
+            visitors_of_day, {"day": day}
+        )
+        batch = []
+        for url_id, visitors in rows:
+            sketch = HyperLogLog(precision)
+            for visitor in visitors:
+                sketch.add_hash(visitor & UINT64_MASK)
+            batch.append({"url_id": url_id, "day": day, "sketch": sketch.to_bytes()})
+            if len(batch) >= SKETCH_BATCH_SIZE:
+                conn.execute(update, batch)
+                batch = []
+        if batch:
+            conn.execute(update, batch)
+        day += timedelta(days=1)
+
+
+def upgrade() -> None:
+    op.add_column('analytics', sa.Column('ip_inet', postgresql.INET(), nullable=True))
+    op.add_column('analytics', sa.Column('visitor_id', sa.BigInteger(), nullable=True))
+
+    conn = op.get_bind()
+    conn.execute(sa.text(TRY_INET_SQL))
+    visitor_id = VISITOR_ID_SQL.format(
+        ip="pg_temp.try_inet(a.ip_address)",
+        user_agent="(SELECT value FROM user_agents WHERE id = a.user_agent_id)",
+    )
+    backfill = sa.text(f"""
+        UPDATE analytics a
+        SET ip_inet = pg_temp.try_inet(a.ip_address), visitor_id = {visitor_id}
+        WHERE a.id >= :start AND a.id < :end AND a.ip_address IS NOT NULL
+    """).bindparams(salt=get_settings().visitor_id_salt)
+    last_start = _backfill(conn, backfill)
+
+    # Nothing can be inserted between the catch-up and the column swap
+    _catch_up(conn, backfill, last_start)
+    op.drop_column('analytics', 'ip_address')
+    op.alter_column('analytics', 'ip_inet', new_column_name='ip_address')
+
+    # Commits the swap first. Sketches of days already removed from
+    # `analytics` keep counting by IP.
+    _rebuild_sketches(conn)
+
+
+def downgrade() -> None:
+    op.add_column('analytics', sa.Column('ip_text', sa.String(45), nullable=True))
+    conn = op.get_bind()
+    backfill = sa.text("""
+        UPDATE analytics SET ip_text = host(ip_address)
+        WHERE id >= :start AND id < :end AND ip_address IS NOT NULL
+    """)
+    _catch_up(conn, backfill, _backfill(conn, backfill))
+    op.drop_column('analytics', 'visitor_id')
+    op.drop_column('analytics', 'ip_address')
+    op.alter_column('analytics', 'ip_text', new_column_name='ip_address')
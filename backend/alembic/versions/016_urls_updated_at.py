@@ -0,0 +1,43 @@
+"""Add urls.updated_at so renamed slugs reach every worker's Bloom filter
+
+Revision ID: 016_urls_updated_at
+Revises: 015_visitor_identity
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '016_urls_updated_at'
+down_revision: Union[str, None] = '015_visitor_identity'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # now() is evaluated once here and stored as the column's missing value, so
+    # no table rewrite; existing rows get the migration time.
+    op.add_column(
+        'urls',
+        sa.Column(
+            'updated_at', sa.DateTime(timezone=True),
+            server_default=sa.text('now()'), nullable=False,
+        ),
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_urls_updated_at', 'urls', ['updated_at'],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_urls_updated_at', table_name='urls',
+            postgresql_concurrently=True, if_exists=True,
+        )
+    op.drop_column('urls', 'updated_at')
@@ -1,22 +1,115 @@
+import time
+from collections import deque
+from uuid import uuid4
+
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import NullPool, AsyncAdaptedQueuePool
 
 from app.config import get_settings
 
 settings = get_settings()
 
-# Use NullPool for serverless databases like Neon to avoid stale connections
-# Add connect_args for connection timeout
+
+class PoolMetrics:
+    """Checkout latency and saturation counters for the engine's pool."""
+
+    def __init__(self, samples: int = 1000):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._recent: deque[float] = deque(maxlen=samples)
+
+    def record(self, wait: float) -> None:
+        self.checkouts += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self._recent.append(wait)
+
+    def stats(self) -> dict:
+        recent = sorted(self._recent)
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "avg_checkout_ms": round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "p99_checkout_ms": round(recent[int(len(recent) * 0.99)] * 1000, 3) if recent else 0.0,
+            "max_checkout_ms": round(self.max_wait * 1000, 3),
+        }
+
+
+pool_metrics = PoolMetrics()
+
+
+class _TimedCheckoutMixin:
+    # With NullPool the checkout time is the full connect + auth handshake
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.timeouts += 1
+            raise
+        finally:
+            pool_metrics.record(time.perf_counter() - started)
+
+
+class TimedNullPool(_TimedCheckoutMixin, NullPool):
+    pass
+
+
+class TimedQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def _engine_options() -> dict:
+    """
+    Engine options for the configured `db_pool_mode`.
+
+    - 'null': no pooling, a fresh connection per session. Safe for serverless
+      databases like Neon that drop idle connections.
+    - 'queue': a persistent pool in each worker.
+    - 'pgbouncer': no app-side pooling and no named prepared statement reuse, for
+      PgBouncer in transaction mode where consecutive statements may run on
+      different server connections.
+    """
+    connect_args = {
+        "timeout": 30,  # Connection timeout in seconds
+        "command_timeout": 30,  # Query timeout in seconds
+    }
+    options = {"connect_args": connect_args}
+
+    if settings.db_pool_mode == "queue":
+        connect_args["prepared_statement_cache_size"] = settings.db_statement_cache_size
+        connect_args["statement_cache_size"] = settings.db_statement_cache_size
+        options.update(
+            poolclass=TimedQueuePool,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+            pool_pre_ping=settings.db_pool_pre_ping,
+        )
+    elif settings.db_pool_mode == "pgbouncer":
+        connect_args["prepared_statement_cache_size"] = 0
+        connect_args["statement_cache_size"] = 0
+        connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid4()}__"
+        options["poolclass"] = TimedNullPool
+    elif settings.db_pool_mode == "null":
+        options["poolclass"] = TimedNullPool  # Don't pool connections for serverless DB
+    else:
+        raise ValueError(f"Unknown DB_POOL_MODE: {settings.db_pool_mode}")
+
+    return options
+
+
 engine = create_async_engine(
     settings.database_url,
     echo=settings.debug,
     future=True,
-    poolclass=NullPool,  # Don't pool connections for serverless DB
-    connect_args={
-        "timeout": 30,  # Connection timeout in seconds
-        "command_timeout": 30,  # Query timeout in seconds
-    },
+    **_engine_options(),
 )
 
 async_session_maker = async_sessionmaker(
@@ -40,4 +133,24 @@ async def get_db() -> AsyncSession:
 
 async def init_db():
     async with engine.begin() as conn:
+        # Required by the trigram search indexes
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
         await conn.run_sync(Base.metadata.create_all)
+
+
+def pool_stats() -> dict:
+    """Pool mode, checkout latency and (for 'queue' mode) saturation."""
+    pool = engine.pool
+    stats = {"mode": settings.db_pool_mode, **pool_metrics.stats()}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        capacity = settings.db_pool_size + settings.db_max_overflow
+        checked_out = pool.checkedout()
+        stats.update(
+            pool_size=pool.size(),
+            max_overflow=settings.db_max_overflow,
+            checked_out=checked_out,
+            checked_in=pool.checkedin(),
+            overflow=pool.overflow(),
+            saturation=round(checked_out / capacity, 3) if capacity else 0.0,
+        )
+    return stats
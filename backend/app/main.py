@@ -6,7 +6,12 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import get_settings
 from app.database import init_db
+from app.services.click_buffer import click_buffer
+from app.services.analytics_ingest import analytics_ingestor
+from app.services.analytics_partitions import analytics_partitions
+from app.services.slug_bloom import slug_bloom
 from app.routers import auth_router, urls_router, redirect_router, admin_router, feedback_router
+from app.routers.redirect import RedirectFastPath
 
 settings = get_settings()
 
@@ -30,8 +35,18 @@ async def lifespan(app: FastAPI):
     """Handle startup and shutdown events."""
     # Startup
     await init_db()
+    await analytics_partitions.ensure()
+    analytics_partitions.start()
+    click_buffer.start()
+    analytics_ingestor.start()
+    if settings.slug_bloom_enabled:
+        slug_bloom.start()
     yield
     # Shutdown
+    await slug_bloom.stop()
+    await analytics_ingestor.stop()
+    await click_buffer.stop()
+    await analytics_partitions.stop()
 
 
 app = FastAPI(
@@ -44,6 +59,10 @@ app = FastAPI(
     redoc_url="/redoc" if settings.debug else None,
 )
 
+# Redirect fast path - added first so it runs inside CORS like the regular route
+if settings.redirect_fast_path:
+    app.add_middleware(RedirectFastPath)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -1,5 +1,18 @@
 from app.models.user import User
-from app.models.url import URL, Analytics
+from app.models.url import URL, Analytics, URLClickShard
+from app.models.rollup import URLDailyStats, URLHourlyStats, URLDailyFacet
+from app.models.dimension import UserAgent, Referrer
 from app.models.feedback import Feedback
 
-__all__ = ["User", "URL", "Analytics", "Feedback"]
+__all__ = [
+    "User",
+    "URL",
+    "Analytics",
+    "URLClickShard",
+    "URLDailyStats",
+    "URLHourlyStats",
+    "URLDailyFacet",
+    "UserAgent",
+    "Referrer",
+    "Feedback",
+]
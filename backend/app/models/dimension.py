@@ -0,0 +1,28 @@
+from sqlalchemy import BigInteger, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class UserAgent(Base):
+    """
+    Distinct user agent strings, keyed by a 64-bit hash of the value (see `dimension_id`).
+
+    By the birthday bound, n distinct values collide with probability about
+    n^2 / 2^65 - roughly 1 in 3,700 at 100 million. Ingestion stores a NULL
+    key for the second value of a collision instead of mapping it onto the first.
+    """
+
+    __tablename__ = "user_agents"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=False)
+    value: Mapped[str] = mapped_column(Text, nullable=False)
+
+
+class Referrer(Base):
+    """Distinct referrer URLs, keyed like `UserAgent` (see its collision bound)."""
+
+    __tablename__ = "referrers"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=False)
+    value: Mapped[str] = mapped_column(Text, nullable=False)
@@ -0,0 +1,60 @@
+from datetime import date, datetime
+from sqlalchemy import String, Date, DateTime, ForeignKey, Text, BigInteger, LargeBinary, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class URLDailyStats(Base):
+    """Per-URL, per-day (UTC) click totals maintained by the analytics ingestion path."""
+
+    __tablename__ = "url_daily_stats"
+
+    url_id: Mapped[int] = mapped_column(
+        BigInteger, ForeignKey("urls.id", ondelete="CASCADE"), primary_key=True
+    )
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    clicks: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    # Serialized HyperLogLog of the day's visitors, merged across days/URLs on read
+    visitor_sketch: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
+
+
+class URLHourlyStats(Base):
+    """
+    Per-URL, per-hour (UTC) click totals maintained by the analytics ingestion path.
+
+    Serves time-range queries whose buckets don't line up with UTC days
+    (hourly series, other time zones, partial days at the range edges).
+    Pruned together with the raw clicks by the old-analytics cleanup.
+    """
+
+    __tablename__ = "url_hourly_stats"
+    __table_args__ = (
+        # Retention deletes by hour; rows arrive in hour order, so BRIN suffices
+        Index("ix_url_hourly_stats_hour_brin", "hour", postgresql_using="brin"),
+    )
+
+    url_id: Mapped[int] = mapped_column(
+        BigInteger, ForeignKey("urls.id", ondelete="CASCADE"), primary_key=True
+    )
+    hour: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    clicks: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+
+
+class URLDailyFacet(Base):
+    """
+    Per-URL, per-day click breakdowns.
+
+    `dimension` is one of device/browser/os/country/referrer (referrers are
+    stored by host); `value` is the attribute value.
+    """
+
+    __tablename__ = "url_daily_facets"
+
+    url_id: Mapped[int] = mapped_column(
+        BigInteger, ForeignKey("urls.id", ondelete="CASCADE"), primary_key=True
+    )
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    dimension: Mapped[str] = mapped_column(String(16), primary_key=True)
+    value: Mapped[str] = mapped_column(Text, primary_key=True)
+    clicks: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
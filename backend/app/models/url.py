@@ -1,8 +1,8 @@
 import uuid
 from datetime import datetime, timezone
-from sqlalchemy import String, DateTime, Integer, ForeignKey, Text, BigInteger
+from sqlalchemy import String, DateTime, Integer, ForeignKey, Text, BigInteger, SmallInteger, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import INET, UUID
 
 from app.database import Base
 
@@ -13,6 +13,20 @@ def utcnow():
 
 class URL(Base):
     __tablename__ = "urls"
+    __table_args__ = (
+        # Keyset pagination of a user's URLs on (created_at, id)
+        Index("ix_urls_user_id_created_at_id", "user_id", "created_at", "id"),
+        # Age-based admin cleanups
+        Index("ix_urls_created_at", "created_at"),
+        # Incremental slug Bloom filter refreshes (new and renamed slugs)
+        Index("ix_urls_updated_at", "updated_at"),
+        # pg_trgm indexes so `ILIKE '%term%'` search doesn't scan every URL
+        Index(
+            "ix_urls_original_url_trgm", "original_url",
+            postgresql_using="gin", postgresql_ops={"original_url": "gin_trgm_ops"},
+        ),
+        Index("ix_urls_slug_trgm", "slug", postgresql_using="gin", postgresql_ops={"slug": "gin_trgm_ops"}),
+    )
 
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
     slug: Mapped[str] = mapped_column(String(50), unique=True, index=True, nullable=False)
@@ -24,29 +38,79 @@ class URL(Base):
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=utcnow, nullable=False
     )
+    # Set on insert and whenever the slug changes - not on click count updates
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=utcnow, server_default=text("now()"), nullable=False
+    )
     expires_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
 
     # Relationships
     user = relationship("User", back_populates="urls")
     analytics = relationship("Analytics", back_populates="url", cascade="all, delete-orphan")
+    click_shards = relationship("URLClickShard", cascade="all, delete-orphan", passive_deletes=True)
 
 
 class Analytics(Base):
+    """
+    Raw click events, range partitioned by month on `timestamp`.
+
+    Partitions are created ahead of time by `AnalyticsPartitionManager`; the
+    primary key includes `timestamp` because Postgres requires the partition key
+    in every unique constraint.
+    """
+
     __tablename__ = "analytics"
+    __table_args__ = (
+        # Per-URL scans (exact visitor counts, recent activity), newest first
+        Index("ix_analytics_url_id_timestamp", "url_id", "timestamp"),
+        # Raw exports page through a URL's rows by id
+        Index("ix_analytics_url_id_id", "url_id", "id"),
+        # Time-range deletes; rows arrive roughly in timestamp order, so a BRIN
+        # index stays tiny compared to a btree
+        Index("ix_analytics_timestamp_brin", "timestamp", postgresql_using="brin"),
+        Index(
+            "ix_analytics_url_id_country", "url_id", "country",
+            postgresql_where=text("country IS NOT NULL"),
+        ),
+        Index(
+            "ix_analytics_url_id_device", "url_id", "device",
+            postgresql_where=text("device IS NOT NULL"),
+        ),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
 
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
     url_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("urls.id"), nullable=False)
     timestamp: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), default=utcnow, nullable=False
+        DateTime(timezone=True), default=utcnow, primary_key=True
+    )
+    ip_address: Mapped[str | None] = mapped_column(INET, nullable=True)
+    # Salted hash of IP + user agent (see `app.utils.visitor_id`)
+    visitor_id: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    # Keys into the user_agents / referrers dimension tables
+    user_agent_id: Mapped[int | None] = mapped_column(
+        BigInteger, ForeignKey("user_agents.id"), nullable=True
+    )
+    referrer_id: Mapped[int | None] = mapped_column(
+        BigInteger, ForeignKey("referrers.id"), nullable=True
     )
-    ip_address: Mapped[str | None] = mapped_column(String(45), nullable=True)
-    user_agent: Mapped[str | None] = mapped_column(Text, nullable=True)
     country: Mapped[str | None] = mapped_column(String(100), nullable=True)
     city: Mapped[str | None] = mapped_column(String(100), nullable=True)
     device: Mapped[str | None] = mapped_column(String(50), nullable=True)
     browser: Mapped[str | None] = mapped_column(String(50), nullable=True)
     os: Mapped[str | None] = mapped_column(String(50), nullable=True)
-    referrer: Mapped[str | None] = mapped_column(Text, nullable=True)
 
     # Relationships
     url = relationship("URL", back_populates="analytics")
+
+
+class URLClickShard(Base):
+    """Extra click counter rows for hot links, summed with `URL.click_count` on read."""
+
+    __tablename__ = "url_click_shards"
+
+    url_id: Mapped[int] = mapped_column(
+        BigInteger, ForeignKey("urls.id", ondelete="CASCADE"), primary_key=True
+    )
+    shard: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    clicks: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
@@ -1,3 +1,5 @@
+import asyncio
+from datetime import datetime
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -11,6 +13,8 @@ from app.schemas import (
     MessageResponse,
 )
 from app.services.admin_service import AdminService
+from app.services.metrics import collect_metrics
+from app.services.analytics_archive import analytics_archive
 from app.routers.deps import get_current_user, get_current_admin_user
 from app.models import User
 
@@ -29,13 +33,16 @@ async def list_users(
 ):
     """Get paginated list of users. Admin only."""
     service = AdminService(db)
-    return await service.get_users(
-        page=page,
-        per_page=per_page,
-        search=search,
-        role=role,
-        is_active=is_active,
-    )
+    try:
+        return await service.get_users(
+            page=page,
+            per_page=per_page,
+            search=search,
+            role=role,
+            is_active=is_active,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
 @router.post("/users", response_model=UserListResponse, status_code=status.HTTP_201_CREATED)
@@ -139,6 +146,27 @@ async def get_admin_stats(
     return await service.get_dashboard_stats()
 
 
+@router.get("/metrics")
+async def get_metrics(
+    current_user: User = Depends(get_current_admin_user),
+):
+    """Get in-process cache and pipeline counters for the serving worker. Admin only."""
+    return collect_metrics()
+
+
+@router.get("/analytics/archive")
+async def query_analytics_archive(
+    url_id: list[int] | None = Query(None, description="Only these links (repeatable)"),
+    user_id: UUID | None = Query(None, description="Only links owned by this user"),
+    start: datetime | None = Query(None, alias="from", description="Inclusive start timestamp (UTC if naive)"),
+    end: datetime | None = Query(None, alias="to", description="Exclusive end timestamp (UTC if naive)"),
+    current_user: User = Depends(get_current_admin_user),
+):
+    """Click totals and breakdowns over archived analytics. Admin only."""
+    # Vectorized scans, but CPU bound - keep them off the event loop
+    return await asyncio.to_thread(analytics_archive.query, url_id, user_id, start, end)
+
+
 @router.get("/cleanup/stats")
 async def get_cleanup_stats(
     current_user: User = Depends(get_current_admin_user),
@@ -186,12 +214,12 @@ async def cleanup_zero_click_links(
 
 @router.post("/cleanup/old-analytics")
 async def cleanup_old_analytics(
-    days_old: int = Query(365, ge=1, description="Delete analytics older than X days"),
+    days_old: int = Query(365, ge=1, description="Archive or delete analytics older than X days"),
     dry_run: bool = Query(True, description="If true, only count without deleting"),
     current_user: User = Depends(get_current_admin_user),
     db: AsyncSession = Depends(get_db),
 ):
-    """Delete analytics records older than specified days. Admin only."""
+    """Archive (or, with the archive disabled, delete) analytics older than specified days. Admin only."""
     service = AdminService(db)
     return await service.cleanup_old_analytics(days_old=days_old, dry_run=dry_run)
 
@@ -1,59 +1,123 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request, BackgroundTasks
-from fastapi.responses import RedirectResponse
+from urllib.parse import quote
+
+from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi.responses import RedirectResponse, JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.types import ASGIApp, Receive, Scope, Send
 
-from app.database import get_db
-from app.services import URLService, AnalyticsService
+from app.database import get_db, async_session_maker
+from app.models.url import utcnow
+from app.services import URLService
+from app.services.analytics_service import ClickEvent
+from app.services.analytics_ingest import analytics_ingestor
 
 router = APIRouter(tags=["Redirect"])
 
+NOT_FOUND_DETAIL = "Link not found or has expired"
+
 
-async def log_analytics(
-    db: AsyncSession,
+def log_analytics(
     url_id: int,
     ip_address: str | None,
     user_agent: str | None,
     referrer: str | None,
 ):
-    """Background task to log analytics."""
-    service = AnalyticsService(db)
+    """Queue a click for the batched analytics writer."""
     # In production, you'd use a GeoIP service to get country/city
-    await service.log_click(
+    analytics_ingestor.submit(ClickEvent(
         url_id=url_id,
+        timestamp=utcnow(),
         ip_address=ip_address,
         user_agent=user_agent,
+        referrer=referrer,
         country=None,  # Would be populated by GeoIP lookup
         city=None,
-        referrer=referrer,
-    )
+    ))
 
 
 @router.get("/r/{slug}")
 async def redirect_to_url(
     slug: str,
     request: Request,
-    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
 ):
     """Redirect to the original URL."""
     service = URLService(db)
     url = await service.increment_click(slug)
-    
+
     if not url:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Link not found or has expired",
+            detail=NOT_FOUND_DETAIL,
         )
-    
-    # Log analytics in background
-    background_tasks.add_task(
-        log_analytics,
-        db,
+
+    log_analytics(
         url.id,
         request.client.host if request.client else None,
         request.headers.get("user-agent"),
         request.headers.get("referer"),
     )
-    
+
     # Use 307 to preserve the request method
     return RedirectResponse(url=url.original_url, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+
+
+class RedirectFastPath:
+    """
+    ASGI middleware that answers `/r/{slug}` before FastAPI routing.
+
+    Skips dependency injection, the request object and response classes, and
+    sends pre-rendered 307/404 responses identical to `redirect_to_url`'s.
+    Everything else - including other methods on `/r/...`, which the router
+    answers with 405 - is passed through to the wrapped app.
+    """
+
+    _not_found = JSONResponse({"detail": NOT_FOUND_DETAIL}, status_code=status.HTTP_404_NOT_FOUND)
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "GET"
+            or not scope["path"].startswith("/r/")
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        slug = scope["path"][3:]
+        if not slug or "/" in slug:
+            await self.app(scope, receive, send)
+            return
+
+        async with async_session_maker() as session:
+            url = await URLService(session).increment_click(slug)
+
+        if not url:
+            await send({
+                "type": "http.response.start",
+                "status": status.HTTP_404_NOT_FOUND,
+                # Copied because outer middleware (CORS) appends to the list
+                "headers": list(self._not_found.raw_headers),
+            })
+            await send({"type": "http.response.body", "body": self._not_found.body})
+            return
+
+        user_agent = referrer = None
+        for name, value in scope["headers"]:
+            if name == b"user-agent":
+                user_agent = value.decode("latin-1")
+            elif name == b"referer":
+                referrer = value.decode("latin-1")
+        client = scope.get("client")
+        log_analytics(url.id, client[0] if client else None, user_agent, referrer)
+
+        # Same escaping as starlette's RedirectResponse
+        location = quote(url.original_url, safe=":/%#?=@[]!$&'()*+,;").encode("latin-1")
+        await send({
+            "type": "http.response.start",
+            "status": status.HTTP_307_TEMPORARY_REDIRECT,
+            "headers": [(b"content-length", b"0"), (b"location", location)],
+        })
+        await send({"type": "http.response.body", "body": b""})
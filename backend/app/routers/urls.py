@@ -1,18 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from datetime import datetime
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import get_settings
 from app.database import get_db
 from app.schemas import (
     URLCreate,
     URLUpdate,
     URLResponse,
     URLListResponse,
+    URLBulkCreate,
+    URLBulkCreateResponse,
     AnalyticsResponse,
 )
-from app.services import URLService, AnalyticsService
+from app.services import URLService
+from app.services.analytics_cache import analytics_cache
+from app.services.analytics_service import AnalyticsRange, Granularity
+from app.services.analytics_export import stream_analytics_export
 from app.routers.deps import get_current_user
 from app.models import User
 
+settings = get_settings()
+
 router = APIRouter(prefix="/urls", tags=["URLs"])
 
 
@@ -30,15 +42,35 @@ async def create_url(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
+@router.post("/bulk", response_model=URLBulkCreateResponse)
+async def bulk_create_urls(
+    data: URLBulkCreate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Create many shortened URLs at once, with a result or error per item."""
+    service = URLService(db)
+    try:
+        return await service.bulk_create_urls(current_user.id, data.items)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
 @router.get("", response_model=URLListResponse)
 async def get_urls(
     search: str | None = Query(None, description="Search in URL or alias"),
+    limit: int = Query(settings.url_page_size, ge=1, le=settings.url_page_size_max),
+    cursor: str | None = Query(None, description="`next_cursor` from the previous page"),
+    sort: Literal["newest", "oldest"] = Query("newest"),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    """Get all URLs for the current user."""
+    """Get a page of URLs for the current user."""
     service = URLService(db)
-    return await service.get_user_urls(current_user.id, search)
+    try:
+        return await service.get_user_urls(current_user.id, search, limit, cursor, sort)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
 @router.get("/stats")
@@ -51,14 +83,31 @@ async def get_stats(
     return await service.get_stats(current_user.id)
 
 
+def analytics_range(
+    start: datetime | None = Query(None, alias="from", description="Inclusive start, rounded down to the hour in `tz` (default: 7 days before `to`)"),
+    end: datetime | None = Query(None, alias="to", description="Exclusive end, rounded up to the hour in `tz` (default: now)"),
+    granularity: Granularity | None = Query(None, description="Click series bucket size (default: day)"),
+    tz: str | None = Query(None, description="IANA time zone for buckets and naive timestamps (default: UTC)"),
+) -> AnalyticsRange:
+    """Time range query parameters shared by the analytics endpoints."""
+    range_ = AnalyticsRange(start, end, granularity, tz)
+    try:
+        range_.resolve()
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return range_
+
+
 @router.get("/analytics", response_model=AnalyticsResponse)
 async def get_user_analytics(
+    response: Response,
+    range_: AnalyticsRange = Depends(analytics_range),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
 ):
     """Get aggregated analytics for all user URLs."""
-    service = AnalyticsService(db)
-    return await service.get_user_analytics(current_user.id)
+    analytics, age = await analytics_cache.get_user_analytics(current_user.id, range_)
+    response.headers["Age"] = str(int(age))
+    return analytics
 
 
 @router.get("/{url_id}", response_model=URLResponse)
@@ -69,32 +118,55 @@ async def get_url(
 ):
     """Get details of a specific URL."""
     service = URLService(db)
-    url = await service.get_url_by_id(url_id, current_user.id)
+    url = await service.get_url_response(url_id, current_user.id)
     if not url:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="URL not found")
-    return URLResponse(
-        id=url.id,
-        slug=url.slug,
-        original_url=url.original_url,
-        short_url=f"{service._build_short_url(url.slug)}",
-        click_count=url.click_count,
-        created_at=url.created_at,
-        expires_at=url.expires_at,
-    )
+    return url
 
 
 @router.get("/{url_id}/analytics", response_model=AnalyticsResponse)
 async def get_url_analytics(
     url_id: int,
+    response: Response,
+    range_: AnalyticsRange = Depends(analytics_range),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
 ):
     """Get analytics for a specific URL."""
-    service = AnalyticsService(db)
     try:
-        return await service.get_url_analytics(url_id, current_user.id)
+        analytics, age = await analytics_cache.get_url_analytics(url_id, current_user.id, range_)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    response.headers["Age"] = str(int(age))
+    return analytics
+
+
+EXPORT_MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+@router.get("/{url_id}/analytics/export")
+async def export_url_analytics(
+    url_id: int,
+    format: Literal["csv", "ndjson"] = Query("csv"),
+    start: datetime | None = Query(None, alias="from", description="Inclusive start timestamp"),
+    end: datetime | None = Query(None, alias="to", description="Exclusive end timestamp"),
+    after_id: int | None = Query(None, description="Resume after the last id received"),
+    gzip: bool = Query(False, description="Gzip the export"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Stream the raw click rows of a URL, ordered by id."""
+    service = URLService(db)
+    if not await service.get_url_by_id(url_id, current_user.id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="URL not found")
+    if start and end and start >= end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'from' must be before 'to'")
+
+    filename = f"analytics-{url_id}.{format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        stream_analytics_export(url_id, format, start, end, after_id, compress=gzip),
+        media_type="application/gzip" if gzip else EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 
 @router.put("/{url_id}", response_model=URLResponse)
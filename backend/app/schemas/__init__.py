@@ -23,6 +23,9 @@ from app.schemas.url import (
     URLUpdate,
     URLResponse,
     URLListResponse,
+    URLBulkCreate,
+    URLBulkItemResult,
+    URLBulkCreateResponse,
     AnalyticsResponse,
     ClickData,
     CountryData,
@@ -61,6 +64,9 @@ __all__ = [
     "URLUpdate",
     "URLResponse",
     "URLListResponse",
+    "URLBulkCreate",
+    "URLBulkItemResult",
+    "URLBulkCreateResponse",
     "AnalyticsResponse",
     "ClickData",
     "CountryData",
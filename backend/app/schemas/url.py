@@ -26,10 +26,29 @@ class URLResponse(BaseModel):
         from_attributes = True
 
 
+class URLBulkCreate(BaseModel):
+    items: list[URLCreate] = Field(..., min_length=1)
+
+
+class URLBulkItemResult(BaseModel):
+    # Position of the item in the request
+    index: int
+    url: URLResponse | None = None
+    error: str | None = None
+
+
+class URLBulkCreateResponse(BaseModel):
+    results: list[URLBulkItemResult]
+    created: int
+    failed: int
+
+
 class URLListResponse(BaseModel):
     urls: list[URLResponse]
     total: int
     total_clicks: int
+    # Pass as `cursor` to fetch the next page; None on the last page
+    next_cursor: str | None = None
 
 
 class ClickData(BaseModel):
@@ -1,17 +1,54 @@
 from uuid import UUID
 from math import ceil
-from sqlalchemy import select, func, delete, text
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select, func, delete, text, exists
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models import User, URL, Analytics
+from app.models import User, URL, Analytics, URLClickShard
 from app.schemas import (
     UserListResponse,
     AdminUserCreate,
     AdminUserUpdate,
     PaginatedUsersResponse,
 )
-from app.utils import get_password_hash
+from app.utils import get_password_hash, like_pattern, search_rank
 from app.services.email_service import is_disposable_email, generate_token, get_token_expiry
+from app.services.slug_cache import slug_cache
+from app.services.analytics_cache import analytics_cache
+from app.services.url_service import url_totals_cache
+from app.services.click_buffer import click_buffer
+from app.services.click_shards import shard_clicks_total
+from app.services.analytics_partitions import (
+    DEFAULT_PARTITION,
+    partitions_before,
+    drop_partition,
+    estimate_rows,
+)
+from app.services.analytics_archive import analytics_archive
+from app.config import get_settings
+
+settings = get_settings()
+
+# One batch of the rows left before the cutoff once whole partitions are gone.
+# Repeating the timestamp bound lets the planner skip the newer partitions.
+DELETE_OLD_ANALYTICS_SQL = text("""
+    DELETE FROM analytics
+    WHERE timestamp < :cutoff
+      AND (id, timestamp) IN (
+          SELECT id, timestamp FROM analytics
+          WHERE timestamp < :cutoff
+          LIMIT :batch
+      )
+""")
+# Hourly rollups only serve ranges the raw clicks still cover
+DELETE_OLD_HOURLY_STATS_SQL = text("""
+    DELETE FROM url_hourly_stats
+    WHERE (url_id, hour) IN (
+        SELECT url_id, hour FROM url_hourly_stats
+        WHERE hour < :cutoff
+        LIMIT :batch
+    )
+""")
 
 
 class AdminService:
@@ -32,10 +69,14 @@ class AdminService:
         count_query = select(func.count(User.id))
         
         # Apply filters
+        order_by = [User.created_at.desc()]
         if search:
-            search_filter = User.email.ilike(f"%{search}%") | User.name.ilike(f"%{search}%")
+            pattern = like_pattern(search)
+            search_filter = User.email.ilike(pattern) | User.name.ilike(pattern)
             query = query.where(search_filter)
             count_query = count_query.where(search_filter)
+            # Closest matches first
+            order_by.insert(0, search_rank(search, User.email, User.name).desc())
         
         if role:
             query = query.where(User.role == role)
@@ -51,7 +92,7 @@ class AdminService:
         
         # Apply pagination
         offset = (page - 1) * per_page
-        query = query.order_by(User.created_at.desc()).offset(offset).limit(per_page)
+        query = query.order_by(*order_by).offset(offset).limit(per_page)
         
         # Execute query
         result = await self.db.execute(query)
@@ -223,6 +264,9 @@ class AdminService:
         )
         
         await self.db.commit()
+        slug_cache.clear()
+        analytics_cache.clear()
+        url_totals_cache.clear()
         return True
 
     async def toggle_user_status(self, user_id: UUID, current_user_id: UUID) -> UserListResponse:
@@ -281,7 +325,8 @@ class AdminService:
         
         # Total clicks
         total_clicks_result = await self.db.execute(select(func.sum(URL.click_count)))
-        total_clicks = total_clicks_result.scalar() or 0
+        total_clicks = (total_clicks_result.scalar() or 0) + click_buffer.pending_total()
+        total_clicks += await shard_clicks_total(self.db)
         
         return {
             "total_users": total_users,
@@ -327,18 +372,16 @@ class AdminService:
         zero_click_links_result = await self.db.execute(
             select(func.count(URL.id)).where(
                 URL.click_count == 0,
+                ~exists().where(URLClickShard.url_id == URL.id),
                 URL.created_at < func.now() - text("interval '90 days'")
             )
         )
         zero_click_links = zero_click_links_result.scalar() or 0
         
         # Analytics older than 1 year
-        old_analytics_result = await self.db.execute(
-            select(func.count(Analytics.id)).where(
-                Analytics.timestamp < func.now() - text("interval '365 days'")
-            )
+        _, _, old_analytics = await self._old_analytics(
+            datetime.now(timezone.utc) - timedelta(days=365)
         )
-        old_analytics = old_analytics_result.scalar() or 0
         
         return {
             "expired_links": expired_links,
@@ -368,6 +411,9 @@ class AdminService:
                 delete(URL).where(URL.expires_at < func.now())
             )
             await self.db.commit()
+            slug_cache.clear()
+            analytics_cache.clear()
+            url_totals_cache.clear()
         
         return {
             "type": "expired_links",
@@ -410,6 +456,9 @@ class AdminService:
                 delete(User).where(User.id.in_(user_ids))
             )
             await self.db.commit()
+            slug_cache.clear()
+            analytics_cache.clear()
+            url_totals_cache.clear()
         
         return {
             "type": "unverified_users",
@@ -422,10 +471,14 @@ class AdminService:
         """Delete links with zero clicks older than specified days."""
         interval = text(f"interval '{days_old} days'")
         
+        # Make sure buffered clicks are counted before judging links as unused
+        await click_buffer.flush()
+        
         # Get zero-click URLs
         result = await self.db.execute(
             select(URL).where(
                 URL.click_count == 0,
+                ~exists().where(URLClickShard.url_id == URL.id),
                 URL.created_at < func.now() - interval
             )
         )
@@ -443,6 +496,9 @@ class AdminService:
                 delete(URL).where(URL.id.in_(url_ids))
             )
             await self.db.commit()
+            slug_cache.clear()
+            analytics_cache.clear()
+            url_totals_cache.clear()
         
         return {
             "type": "zero_click_links",
@@ -451,31 +507,89 @@ class AdminService:
             "deleted": not dry_run,
         }
 
-    async def cleanup_old_analytics(self, days_old: int = 365, dry_run: bool = True) -> dict:
-        """Delete analytics records older than specified days."""
-        interval = text(f"interval '{days_old} days'")
-        
-        # Count old analytics
-        count_result = await self.db.execute(
-            select(func.count(Analytics.id)).where(
-                Analytics.timestamp < func.now() - interval
-            )
+    async def _old_analytics(self, cutoff: datetime):
+        """
+        Analytics older than `cutoff`: (whole partitions, rows outside them, total).
+
+        The total adds the partitions' planner estimates to an exact count of
+        the other rows, so the large old partitions are never scanned.
+        """
+        conn = await self.db.connection()
+        old_partitions = await partitions_before(conn, cutoff)
+        # Newer monthly partitions only; the lower bound prunes the old ones
+        remaining_query = select(func.count(Analytics.id)).where(
+            Analytics.timestamp < cutoff,
+            text(f"analytics.tableoid <> '{DEFAULT_PARTITION}'::regclass"),
         )
-        count = count_result.scalar() or 0
-        
-        if not dry_run and count > 0:
-            await self.db.execute(
-                delete(Analytics).where(
-                    Analytics.timestamp < func.now() - interval
+        if old_partitions:
+            remaining_query = remaining_query.where(
+                Analytics.timestamp >= datetime.combine(
+                    old_partitions[-1].end, datetime.min.time(), timezone.utc
                 )
             )
+        remaining = (await self.db.execute(remaining_query)).scalar() or 0
+        # The default partition can hold rows of any age (clock skew, backfills)
+        remaining += (await self.db.execute(
+            text(f"SELECT count(*) FROM {DEFAULT_PARTITION} WHERE timestamp < :cutoff"),
+            {"cutoff": cutoff},
+        )).scalar() or 0
+        return old_partitions, remaining, await estimate_rows(conn, old_partitions) + remaining
+
+    async def _delete_in_batches(self, statement, cutoff: datetime) -> None:
+        """Run a batched DELETE until it comes up short, committing each batch."""
+        while True:
+            result = await self.db.execute(
+                statement, {"cutoff": cutoff, "batch": settings.analytics_cleanup_batch_rows}
+            )
             await self.db.commit()
+            if result.rowcount < settings.analytics_cleanup_batch_rows:
+                break
+
+    async def cleanup_old_analytics(self, days_old: int = 365, dry_run: bool = True) -> dict:
+        """
+        Archive or delete analytics records older than specified days.
+
+        Monthly partitions entirely before the cutoff are detached and dropped,
+        each in its own short transaction since DETACH blocks all reads and
+        writes of `analytics` until commit. With the archive enabled each one
+        is written to it first, before its DETACH. Rows outside whole monthly
+        partitions are left in place then: the boundary month is archived by a
+        later run, but old rows in the default partition (clock skew,
+        backfills) never are - they are reported as `unarchived` and can be
+        removed by a run with the archive disabled. Without the archive those
+        rows are deleted in batches of `analytics_cleanup_batch_rows`. Hourly
+        rollups before the cutoff are pruned the same way either way; daily
+        rollups are kept.
+
+        `count` is estimated, see `_old_analytics`.
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(days=days_old)
+        
+        old_partitions, remaining, count = await self._old_analytics(cutoff)
+        # Don't hold this snapshot (and its locks) across the cleanup
+        await self.db.commit()
+        
+        archived = []
+        if not dry_run and (old_partitions or remaining):
+            for partition in old_partitions:
+                if settings.analytics_archive_enabled:
+                    rows = await analytics_archive.write_partition(partition)
+                    archived.append({"month": partition.start.isoformat(), "rows": rows})
+                await drop_partition(await self.db.connection(), partition.name)
+                await self.db.commit()
+            if not settings.analytics_archive_enabled and remaining:
+                await self._delete_in_batches(DELETE_OLD_ANALYTICS_SQL, cutoff)
+            analytics_cache.clear()
+        if not dry_run:
+            await self._delete_in_batches(DELETE_OLD_HOURLY_STATS_SQL, cutoff)
         
         return {
             "type": "old_analytics",
             "count": count,
             "days_old": days_old,
             "deleted": not dry_run,
+            "archived": archived,
+            "unarchived": remaining if settings.analytics_archive_enabled else 0,
         }
 
     async def cleanup_inactive_users(self, days_old: int = 30, dry_run: bool = True) -> dict:
@@ -0,0 +1,324 @@
+import asyncio
+import os
+import shutil
+import threading
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import NamedTuple
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import text
+
+from app.config import get_settings
+from app.database import engine
+from app.services.analytics_partitions import AnalyticsPartition, add_months, month_start
+from app.utils import LRUCache
+
+settings = get_settings()
+
+# Relative archive directories are resolved against the backend directory,
+# not the working directory of whichever process runs the cleanup
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+# Columns stored as int32 codes into a per-chunk list of distinct values
+# (-1 for NULL). The values are saved as one UTF-8 blob plus offsets, since
+# fixed-width string arrays pad every value to the longest one. `user_id` is
+# copied from urls at archive time so billing reports survive the link being
+# deleted later.
+DICTIONARY_COLUMNS = (
+    "user_id", "ip_address", "user_agent", "country", "city",
+    "device", "browser", "os", "referrer",
+)
+BREAKDOWNS = ("country", "device", "browser", "os")
+
+ARCHIVE_ROWS_SQL = """
+    SELECT a.id, a.url_id, a.timestamp, CAST(u.user_id AS text) AS user_id,
+           host(a.ip_address) AS ip_address, ua.value AS user_agent, a.country, a.city, a.device, a.browser, a.os,
+           r.value AS referrer
+    FROM {partition} a
+    LEFT JOIN urls u ON u.id = a.url_id
+    LEFT JOIN user_agents ua ON ua.id = a.user_agent_id
+    LEFT JOIN referrers r ON r.id = a.referrer_id
+"""
+
+
+class ArchivedChunk(NamedTuple):
+    """One chunk of a month's archived clicks as column arrays."""
+
+    month: date
+    id: np.ndarray
+    url_id: np.ndarray
+    # Microseconds since the Unix epoch, UTC
+    timestamp: np.ndarray
+    codes: dict[str, np.ndarray]
+    # Object arrays of str, indexed by code
+    values: dict[str, np.ndarray]
+
+    def code_of(self, column: str, value: str) -> int | None:
+        matches = np.flatnonzero(self.values[column] == value)
+        return int(matches[0]) if len(matches) else None
+
+
+def to_micros(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - EPOCH) // MICROSECOND
+
+
+def from_micros(value: int) -> datetime:
+    return EPOCH + value * MICROSECOND
+
+
+def pack_strings(values: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """(UTF-8 bytes, end offsets) for a list of strings."""
+    encoded = [value.encode() for value in values]
+    data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    offsets = np.cumsum(np.fromiter(map(len, encoded), np.int64, len(encoded)))
+    return data, offsets
+
+
+def unpack_strings(data: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    blob = data.tobytes()
+    starts = np.concatenate(([0], offsets[:-1]))
+    values = np.empty(len(offsets), dtype=object)
+    values[:] = [blob[start:end].decode() for start, end in zip(starts.tolist(), offsets.tolist())]
+    return values
+
+
+class _ColumnBuilder:
+    """Accumulates one chunk's rows, batch by batch, into column arrays."""
+
+    def __init__(self):
+        self.ids: list[np.ndarray] = []
+        self.url_ids: list[np.ndarray] = []
+        self.timestamps: list[np.ndarray] = []
+        self.codes: dict[str, list[np.ndarray]] = {name: [] for name in DICTIONARY_COLUMNS}
+        self.dictionaries: dict[str, dict[str, int]] = {name: {} for name in DICTIONARY_COLUMNS}
+        self.rows = 0
+
+    def add(self, rows) -> None:
+        self.ids.append(np.fromiter((row.id for row in rows), np.int64, len(rows)))
+        self.url_ids.append(np.fromiter((row.url_id for row in rows), np.int64, len(rows)))
+        self.timestamps.append(
+            np.fromiter((to_micros(row.timestamp) for row in rows), np.int64, len(rows))
+        )
+        for name in DICTIONARY_COLUMNS:
+            index = self.dictionaries[name]
+            self.codes[name].append(np.fromiter(
+                (-1 if value is None else index.setdefault(value, len(index))
+                 for value in (getattr(row, name) for row in rows)),
+                np.int32,
+                len(rows),
+            ))
+        self.rows += len(rows)
+
+    def arrays(self) -> dict[str, np.ndarray]:
+        def join(chunks: list[np.ndarray], dtype) -> np.ndarray:
+            return np.concatenate(chunks) if chunks else np.empty(0, dtype)
+
+        arrays = {
+            "id": join(self.ids, np.int64),
+            "url_id": join(self.url_ids, np.int64),
+            "timestamp": join(self.timestamps, np.int64),
+        }
+        for name in DICTIONARY_COLUMNS:
+            arrays[f"{name}_codes"] = join(self.codes[name], np.int32)
+            arrays[f"{name}_data"], arrays[f"{name}_offsets"] = pack_strings(list(self.dictionaries[name]))
+        return arrays
+
+
+class AnalyticsArchive:
+    """
+    Cold storage for aged analytics partitions.
+
+    Each month becomes a directory under `directory` of compressed `.npz`
+    files of column arrays, one per `analytics_archive_chunk_rows` rows, with
+    the text columns dictionary-encoded per file. Reports over the archive
+    are vectorized NumPy scans of the months they touch; recently read months
+    are kept decoded in memory. The directory should be storage shared by
+    every host serving the admin API; a relative one is resolved against the
+    backend directory.
+
+    Building, saving and querying run in worker threads, so the month cache
+    is only touched under `_lock`.
+    """
+
+    def __init__(self, directory: str, cache_months: int):
+        self.directory = BACKEND_DIR / directory
+        self._months = LRUCache(cache_months)
+        self._lock = threading.Lock()
+        self.archived_rows = 0
+
+    def path(self, month: date) -> Path:
+        return self.directory / f"analytics_y{month.year:04d}m{month.month:02d}"
+
+    def months(self) -> list[date]:
+        """Archived months, oldest first."""
+        if not self.directory.is_dir():
+            return []
+        return sorted(
+            date(int(path.name[11:15]), int(path.name[16:18]), 1)
+            for path in self.directory.glob("analytics_y*m*")
+            # Not interrupted .partial writes or .old replaced months
+            if len(path.name) == len("analytics_y0000m00") and path.is_dir()
+        )
+
+    @staticmethod
+    def _start(partial: Path) -> None:
+        shutil.rmtree(partial, ignore_errors=True)
+        partial.mkdir(parents=True)
+
+    @staticmethod
+    def _save_chunk(partial: Path, index: int, builder: _ColumnBuilder) -> None:
+        np.savez_compressed(partial / f"chunk{index:05d}.npz", **builder.arrays())
+
+    def _publish(self, month: date, partial: Path) -> None:
+        path = self.path(month)
+        old = path.with_name(f"{path.name}.old")
+        shutil.rmtree(old, ignore_errors=True)
+        if path.exists():
+            os.replace(path, old)
+        os.replace(partial, path)
+        shutil.rmtree(old, ignore_errors=True)
+        with self._lock:
+            self._months.pop(month)
+
+    async def write_partition(self, partition: AnalyticsPartition) -> int:
+        """
+        Write a monthly partition to its archive directory. Returns the rows written.
+
+        Rows are read on a connection of their own, so no lock is held on
+        `analytics` by the caller meanwhile, and encoded and compressed in a
+        worker thread, one `analytics_archive_chunk_rows` file at a time so
+        memory doesn't grow with the month. The month is written to a
+        `.partial` directory and renamed into place, so re-archiving a month
+        that was written but not dropped (e.g. the transaction failed) is safe.
+        """
+        path = self.path(partition.start)
+        partial = path.with_name(f"{path.name}.partial")
+        await asyncio.to_thread(self._start, partial)
+        builder = _ColumnBuilder()
+        chunks = rows = 0
+        async with engine.connect() as conn:
+            result = await conn.stream(
+                text(ARCHIVE_ROWS_SQL.format(partition=partition.name)).execution_options(
+                    yield_per=settings.analytics_export_yield_per
+                )
+            )
+            async for batch in result.partitions():
+                await asyncio.to_thread(builder.add, batch)
+                if builder.rows >= settings.analytics_archive_chunk_rows:
+                    await asyncio.to_thread(self._save_chunk, partial, chunks, builder)
+                    chunks += 1
+                    rows += builder.rows
+                    builder = _ColumnBuilder()
+        if builder.rows or not chunks:
+            await asyncio.to_thread(self._save_chunk, partial, chunks, builder)
+            rows += builder.rows
+
+        await asyncio.to_thread(self._publish, partition.start, partial)
+        self.archived_rows += rows
+        return rows
+
+    def load(self, month: date) -> list[ArchivedChunk]:
+        with self._lock:
+            cached = self._months.get(month)
+        if cached is not None:
+            return cached
+        archived = []
+        for path in sorted(self.path(month).glob("chunk*.npz")):
+            with np.load(path) as data:
+                archived.append(ArchivedChunk(
+                    month=month,
+                    id=data["id"],
+                    url_id=data["url_id"],
+                    timestamp=data["timestamp"],
+                    codes={name: data[f"{name}_codes"] for name in DICTIONARY_COLUMNS},
+                    values={
+                        name: unpack_strings(data[f"{name}_data"], data[f"{name}_offsets"])
+                        for name in DICTIONARY_COLUMNS
+                    },
+                ))
+        with self._lock:
+            self._months.set(month, archived)
+        return archived
+
+    def query(
+        self,
+        url_ids: list[int] | None = None,
+        user_id: UUID | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> dict:
+        """
+        Click totals and breakdowns over the archive.
+
+        Filters combine: clicks on `url_ids`, on links owned by `user_id`,
+        between `start` (inclusive) and `end` (exclusive). CPU bound - run it
+        in a thread from async code.
+        """
+        first = month_start(from_micros(to_micros(start))) if start else None
+        last = month_start(from_micros(to_micros(end))) if end else None
+        url_filter = np.asarray(url_ids, dtype=np.int64) if url_ids is not None else None
+
+        total = 0
+        by_month = []
+        breakdowns = {name: Counter() for name in BREAKDOWNS}
+        for month in self.months():
+            if (first and add_months(month, 1) <= first) or (last and month > last):
+                continue
+            month_clicks = 0
+            for archived in self.load(month):
+                mask = np.ones(len(archived.id), dtype=bool)
+                if url_filter is not None:
+                    mask &= np.isin(archived.url_id, url_filter)
+                if user_id is not None:
+                    code = archived.code_of("user_id", str(user_id))
+                    if code is None:
+                        continue
+                    mask &= archived.codes["user_id"] == code
+                if start is not None:
+                    mask &= archived.timestamp >= to_micros(start)
+                if end is not None:
+                    mask &= archived.timestamp < to_micros(end)
+
+                clicks = int(np.count_nonzero(mask))
+                if not clicks:
+                    continue
+                month_clicks += clicks
+                for name in BREAKDOWNS:
+                    values = archived.values[name]
+                    # Shifted by one so NULL (-1) lands in bin 0
+                    counts = np.bincount(archived.codes[name][mask] + 1, minlength=len(values) + 1)
+                    for code in np.flatnonzero(counts[1:]):
+                        breakdowns[name][str(values[code])] += int(counts[code + 1])
+            if month_clicks:
+                total += month_clicks
+                by_month.append({"month": month.isoformat(), "clicks": month_clicks})
+
+        return {
+            "total_clicks": total,
+            "months": by_month,
+            **{
+                name: [{"value": value, "clicks": clicks} for value, clicks in counter.most_common()]
+                for name, counter in breakdowns.items()
+            },
+        }
+
+    def stats(self) -> dict:
+        return {
+            "directory": str(self.directory),
+            "months": len(self.months()),
+            "archived_rows": self.archived_rows,
+            "cached_months": len(self._months),
+        }
+
+
+analytics_archive = AnalyticsArchive(
+    settings.analytics_archive_dir, settings.analytics_archive_cache_months
+)
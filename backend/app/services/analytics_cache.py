@@ -0,0 +1,126 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Hashable, NamedTuple
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.database import async_session_maker
+from app.schemas import AnalyticsResponse
+from app.services.analytics_service import AnalyticsRange, AnalyticsService
+from app.services.analytics_ingest import analytics_ingestor
+from app.utils import LRUCache, BoundedVersionMap
+
+settings = get_settings()
+
+# Users whose last invalidation is remembered individually; older ones share a floor
+TRACKED_USER_VERSIONS = 100_000
+
+Compute = Callable[[AsyncSession], Awaitable[tuple[AnalyticsResponse, tuple[int, ...]]]]
+
+
+class CachedAnalytics(NamedTuple):
+    response: AnalyticsResponse
+    url_ids: tuple[int, ...]
+    # Ingestion sequence and owner version observed before computing
+    sequence: int
+    user_version: int
+    computed_at: float
+
+
+class AnalyticsResponseCache:
+    """
+    Per-worker cache of analytics responses with request coalescing.
+
+    An entry is served until its TTL expires or this worker's ingestor writes
+    clicks for one of its URLs (the ingestion watermark moves past the entry).
+    Clicks ingested by other workers only show up after the TTL. Concurrent
+    misses for the same key share one computation on its own session.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = LRUCache(maxsize, ttl)
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+        self._user_versions = BoundedVersionMap(TRACKED_USER_VERSIONS)
+        self.stale = 0
+        self.coalesced = 0
+
+    def invalidate(self, user_id: UUID) -> None:
+        """Drop a user's cached responses after their set of URLs changed."""
+        self._user_versions.bump(user_id)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def _is_current(self, entry: CachedAnalytics, user_id: UUID) -> bool:
+        return (
+            self._user_versions.get(user_id) == entry.user_version
+            and analytics_ingestor.watermark(entry.url_ids) <= entry.sequence
+        )
+
+    async def _compute(self, key: Hashable, user_id: UUID, compute: Compute) -> CachedAnalytics:
+        sequence = analytics_ingestor.sequence
+        user_version = self._user_versions.get(user_id)
+        async with async_session_maker() as session:
+            response, url_ids = await compute(session)
+        entry = CachedAnalytics(response, url_ids, sequence, user_version, time.monotonic())
+        self._cache.set(key, entry)
+        return entry
+
+    async def _get(
+        self, key: Hashable, user_id: UUID, compute: Compute
+    ) -> tuple[AnalyticsResponse, float]:
+        """Return (response, age in seconds), computing it at most once at a time."""
+        entry = self._cache.get(key)
+        if entry is not None:
+            if self._is_current(entry, user_id):
+                return entry.response, time.monotonic() - entry.computed_at
+            self.stale += 1
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._compute(key, user_id, compute))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # Shielded so a disconnecting client doesn't cancel the other waiters' result
+        entry = await asyncio.shield(task)
+        return entry.response, time.monotonic() - entry.computed_at
+
+    async def get_url_analytics(
+        self, url_id: int, user_id: UUID, range_: AnalyticsRange = AnalyticsRange()
+    ) -> tuple[AnalyticsResponse, float]:
+        """Cached `AnalyticsService.get_url_analytics`."""
+        async def compute(db: AsyncSession):
+            response = await AnalyticsService(db).get_url_analytics(url_id, user_id, range_)
+            return response, (url_id,)
+
+        return await self._get(("url", url_id, user_id, range_), user_id, compute)
+
+    async def get_user_analytics(
+        self, user_id: UUID, range_: AnalyticsRange = AnalyticsRange()
+    ) -> tuple[AnalyticsResponse, float]:
+        """Cached `AnalyticsService.get_user_analytics`."""
+        async def compute(db: AsyncSession):
+            service = AnalyticsService(db)
+            url_ids = await service.get_user_url_ids(user_id)
+            response = await service.get_user_analytics(user_id, url_ids, range_)
+            return response, tuple(url_ids)
+
+        return await self._get(("user", user_id, range_), user_id, compute)
+
+    def stats(self) -> dict:
+        return {
+            **self._cache.stats(),
+            "stale": self.stale,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight),
+            "tracked_users": len(self._user_versions),
+        }
+
+
+analytics_cache = AnalyticsResponseCache(
+    settings.analytics_cache_size, settings.analytics_cache_ttl_seconds
+)
@@ -0,0 +1,131 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Literal
+
+from sqlalchemy import select
+
+from app.config import get_settings
+from app.database import engine
+from app.models import Analytics, UserAgent, Referrer
+
+settings = get_settings()
+
+ExportFormat = Literal["csv", "ndjson"]
+
+# Link owners get the salted visitor_id, never the visitor's IP address
+EXPORT_COLUMNS = (
+    Analytics.id,
+    Analytics.timestamp,
+    Analytics.visitor_id,
+    UserAgent.value.label("user_agent"),
+    Referrer.value.label("referrer"),
+    Analytics.country,
+    Analytics.city,
+    Analytics.device,
+    Analytics.browser,
+    Analytics.os,
+)
+EXPORT_FIELDS = tuple(column.key for column in EXPORT_COLUMNS)
+
+
+def _encode_csv(rows, header: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_FIELDS)
+    writer.writerows(
+        (row[0], row[1].isoformat(), *row[2:]) for row in rows
+    )
+    return buffer.getvalue()
+
+
+def _encode_ndjson(rows) -> str:
+    return "".join(
+        json.dumps(dict(zip(EXPORT_FIELDS, (row[0], row[1].isoformat(), *row[2:])))) + "\n"
+        for row in rows
+    )
+
+
+async def _read_page(
+    url_id: int,
+    fmt: ExportFormat,
+    start: datetime | None,
+    end: datetime | None,
+    after_id: int | None,
+    header: bool,
+) -> tuple[str, int | None, int]:
+    """
+    Encode the next page of rows after `after_id`.
+
+    Returns (text, last id, row count). Rows come off a server-side cursor in
+    `yield_per` batches; the connection is released before the page is sent,
+    so a slow client never holds one.
+    """
+    query = (
+        select(*EXPORT_COLUMNS)
+        .select_from(Analytics)
+        .outerjoin(UserAgent, UserAgent.id == Analytics.user_agent_id)
+        .outerjoin(Referrer, Referrer.id == Analytics.referrer_id)
+        .where(Analytics.url_id == url_id)
+        .order_by(Analytics.id)
+        .limit(settings.analytics_export_page_rows)
+        .execution_options(yield_per=settings.analytics_export_yield_per)
+    )
+    if start is not None:
+        query = query.where(Analytics.timestamp >= start)
+    if end is not None:
+        query = query.where(Analytics.timestamp < end)
+    if after_id is not None:
+        query = query.where(Analytics.id > after_id)
+
+    parts = []
+    count = 0
+    last_id = after_id
+    async with engine.connect() as conn:
+        result = await conn.stream(query)
+        async for rows in result.partitions():
+            if fmt == "csv":
+                parts.append(_encode_csv(rows, header and count == 0))
+            else:
+                parts.append(_encode_ndjson(rows))
+            count += len(rows)
+            last_id = rows[-1][0]
+    if header and count == 0 and fmt == "csv":
+        parts.append(_encode_csv([], header=True))
+    return "".join(parts), last_id, count
+
+
+async def stream_analytics_export(
+    url_id: int,
+    fmt: ExportFormat = "csv",
+    start: datetime | None = None,
+    end: datetime | None = None,
+    after_id: int | None = None,
+    compress: bool = False,
+) -> AsyncIterator[bytes]:
+    """
+    Stream a URL's raw click rows in `id` order as CSV or NDJSON.
+
+    Pages of `analytics_export_page_rows` are read on short-lived connections,
+    so memory stays flat and no connection is held while the client reads.
+    An interrupted export resumes with `after_id` set to the last id received;
+    the CSV header is only written on the first request so resumed output can
+    be appended. `compress` gzips the stream.
+    """
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    header = after_id is None
+    while True:
+        text, after_id, count = await _read_page(url_id, fmt, start, end, after_id, header)
+        header = False
+        data = text.encode()
+        if compressor is not None:
+            data = compressor.compress(data)
+        if data:
+            yield data
+        if count < settings.analytics_export_page_rows:
+            break
+    if compressor is not None:
+        yield compressor.flush()
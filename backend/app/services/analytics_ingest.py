@@ -0,0 +1,147 @@
+import asyncio
+import logging
+from typing import Iterable
+
+from app.config import get_settings
+from app.database import async_session_maker
+from app.services.analytics_service import AnalyticsService, ClickEvent
+from app.utils import BoundedVersionMap
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+# URLs whose last write is remembered individually; older ones share a floor
+WATERMARK_TRACKED_URLS = 100_000
+
+
+class AnalyticsIngestor:
+    """
+    Bounded queue of click events drained in batches by a single consumer task.
+
+    The redirect path only enqueues; the consumer writes up to `batch_size` events
+    per multi-row INSERT, waiting at most `flush_interval_ms` for a batch to fill.
+    When the queue is full new events are dropped (and counted) rather than
+    slowing redirects down.
+    """
+
+    def __init__(self, max_queue_size: int, batch_size: int, flush_interval_ms: int):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._batch_ready = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+        self.enqueued = 0
+        self.dropped = 0
+        self.batches = 0
+        self.written = 0
+        self.failed = 0
+        # Ingestion watermark: a sequence number bumped after every written batch,
+        # and the sequence at which each recently written URL last changed
+        self.sequence = 0
+        self._url_sequence = BoundedVersionMap(WATERMARK_TRACKED_URLS)
+
+    def submit(self, event: ClickEvent) -> bool:
+        """Queue a click event without blocking. Returns False if it was dropped."""
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        self.enqueued += 1
+        if self._queue.qsize() >= self.batch_size:
+            self._batch_ready.set()
+        return True
+
+    async def _write(self, events: list[ClickEvent]) -> None:
+        try:
+            async with async_session_maker() as session:
+                written = await AnalyticsService(session).log_clicks(events)
+        except Exception:
+            logger.exception("Failed to write %d click events", len(events))
+            self.failed += len(events)
+            return
+        self.batches += 1
+        self.written += written
+        self._advance({event.url_id for event in events})
+
+    def _advance(self, url_ids: set[int]) -> None:
+        self.sequence += 1
+        for url_id in url_ids:
+            self._url_sequence.set(url_id, self.sequence)
+
+    def watermark(self, url_ids: Iterable[int]) -> int:
+        """Sequence of the last batch this worker wrote for any of the URLs."""
+        return max(
+            (self._url_sequence.get(url_id) for url_id in url_ids),
+            default=self._url_sequence.floor,
+        )
+
+    async def _run(self) -> None:
+        while True:
+            first = await self._queue.get()
+            if first is _STOP:
+                return
+
+            # Give the batch a chance to fill up before writing
+            if not self._stopping and self._queue.qsize() + 1 < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._batch_ready.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._batch_ready.clear()
+
+            batch = [first]
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    event = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if event is _STOP:
+                    stop = True
+                    break
+                batch.append(event)
+
+            await self._write(batch)
+            if stop:
+                return
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Drain everything already queued, then stop the consumer."""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._batch_ready.set()
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "max_queue_size": self._queue.maxsize,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "written": self.written,
+            "failed": self.failed,
+            "sequence": self.sequence,
+            "avg_batch_size": round(self.written / self.batches, 1) if self.batches else 0.0,
+            "batch_size": self.batch_size,
+            "flush_interval_ms": int(self.flush_interval * 1000),
+        }
+
+
+analytics_ingestor = AnalyticsIngestor(
+    settings.analytics_queue_size,
+    settings.analytics_batch_size,
+    settings.analytics_flush_interval_ms,
+)
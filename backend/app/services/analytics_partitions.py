@@ -0,0 +1,183 @@
+import asyncio
+import logging
+from datetime import date, datetime, timezone
+from typing import NamedTuple
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.config import get_settings
+from app.database import engine
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+DEFAULT_PARTITION = "analytics_default"
+
+# Serializes partition DDL across workers starting at the same time
+_LOCK_KEY = 0x616E6C79  # "anly"
+
+LIST_PARTITIONS_SQL = text("""
+    SELECT child.relname
+    FROM pg_inherits
+    JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+    JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+    WHERE parent.relname = 'analytics'
+""")
+
+# Planner row counts (-1 before the first ANALYZE), not an exact count
+ESTIMATE_ROWS_SQL = text("""
+    SELECT coalesce(sum(greatest(reltuples, 0)), 0)::bigint
+    FROM pg_class
+    WHERE relname = ANY(CAST(:names AS text[]))
+""")
+
+
+def month_start(value: date | datetime) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"analytics_y{month.year:04d}m{month.month:02d}"
+
+
+def create_partition_sql(month: date) -> str:
+    """DDL for the partition holding the (UTC) calendar month starting at `month`."""
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF analytics "
+        f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') "
+        f"TO ('{add_months(month, 1).isoformat()} 00:00:00+00')"
+    )
+
+
+class AnalyticsPartition(NamedTuple):
+    name: str
+    start: date
+    end: date
+
+
+def _parse_partition(name: str) -> AnalyticsPartition | None:
+    """Monthly partitions are recognised by name; the default partition is not one."""
+    if not name.startswith("analytics_y") or len(name) != len("analytics_y0000m00"):
+        return None
+    start = date(int(name[11:15]), int(name[16:18]), 1)
+    return AnalyticsPartition(name, start, add_months(start, 1))
+
+
+async def list_partitions(conn: AsyncConnection) -> list[AnalyticsPartition]:
+    """Monthly partitions of `analytics`, oldest first."""
+    result = await conn.execute(LIST_PARTITIONS_SQL)
+    partitions = [_parse_partition(name) for name in result.scalars()]
+    return sorted(p for p in partitions if p is not None)
+
+
+async def partitions_before(conn: AsyncConnection, cutoff: datetime) -> list[AnalyticsPartition]:
+    """Monthly partitions whose rows are all older than `cutoff`."""
+    cutoff_day = cutoff.astimezone(timezone.utc).date()
+    return [p for p in await list_partitions(conn) if p.end <= cutoff_day]
+
+
+async def estimate_rows(conn: AsyncConnection, partitions: list[AnalyticsPartition]) -> int:
+    """Approximate row count of `partitions`, without scanning them."""
+    if not partitions:
+        return 0
+    result = await conn.execute(ESTIMATE_ROWS_SQL, {"names": [p.name for p in partitions]})
+    return result.scalar() or 0
+
+
+async def drop_partition(conn: AsyncConnection, name: str) -> None:
+    """
+    Detach and drop a partition - no row-by-row delete, no table bloat.
+
+    DETACH takes an ACCESS EXCLUSIVE lock on `analytics` (CONCURRENTLY is not
+    allowed next to a default partition), so commit right after this.
+    """
+    await conn.execute(text(f"ALTER TABLE analytics DETACH PARTITION {name}"))
+    await conn.execute(text(f"DROP TABLE {name}"))
+
+
+class AnalyticsPartitionManager:
+    """
+    Keeps monthly `analytics` partitions created ahead of time.
+
+    Partitions for the current month and `months_ahead` following months are
+    created at startup and re-checked every `check_seconds`. A default partition
+    catches anything outside them (clock skew, backfills) so inserts never fail.
+    """
+
+    def __init__(self, months_ahead: int, check_seconds: float):
+        self.months_ahead = months_ahead
+        self.check_seconds = check_seconds
+        self._task: asyncio.Task | None = None
+        self.created = 0
+        self.last_checked: datetime | None = None
+
+    async def ensure(self) -> list[str]:
+        """Create any missing partitions. Returns the names created."""
+        current = month_start(datetime.now(timezone.utc))
+        created = []
+        async with engine.begin() as conn:
+            await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _LOCK_KEY})
+            existing = {p.name for p in await list_partitions(conn)}
+            for offset in range(self.months_ahead + 1):
+                month = add_months(current, offset)
+                if partition_name(month) in existing:
+                    continue
+                try:
+                    async with conn.begin_nested():
+                        await conn.execute(text(create_partition_sql(month)))
+                except DBAPIError:
+                    # Rows for this month already landed in the default partition
+                    logger.exception("Could not create %s", partition_name(month))
+                    continue
+                created.append(partition_name(month))
+            await conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF analytics DEFAULT"
+            ))
+        if created:
+            logger.info("Created analytics partitions: %s", ", ".join(created))
+        self.created += len(created)
+        self.last_checked = datetime.now(timezone.utc)
+        return created
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_seconds)
+            try:
+                await self.ensure()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Analytics partition check failed")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "months_ahead": self.months_ahead,
+            "created": self.created,
+            "last_checked": self.last_checked.isoformat() if self.last_checked else None,
+        }
+
+
+analytics_partitions = AnalyticsPartitionManager(
+    settings.analytics_partition_months_ahead,
+    settings.analytics_partition_check_seconds,
+)
@@ -1,10 +1,19 @@
 from uuid import UUID
-from datetime import datetime, timedelta, timezone
-from sqlalchemy import select, func, and_
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from typing import Literal, NamedTuple
+from urllib.parse import urlparse
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from sqlalchemy import select, insert, update, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from user_agents import parse
 
-from app.models import URL, Analytics
+from app.models import URL, Analytics, URLDailyStats, URLHourlyStats, URLDailyFacet
+from app.models.url import utcnow
+from app.utils import ua_classifier, HyperLogLog, UINT64_MASK, normalize_ip, visitor_id
+from app.services.dimensions import user_agents, referrers
+from app.config import get_settings
 from app.schemas import (
     AnalyticsResponse,
     ClickData,
@@ -13,6 +22,351 @@ from app.schemas import (
     RecentActivity,
 )
 
+settings = get_settings()
+
+
+class ClickEvent(NamedTuple):
+    """A redirect captured on the request path, written later by the ingestion pipeline."""
+
+    url_id: int
+    timestamp: datetime
+    ip_address: str | None = None
+    user_agent: str | None = None
+    referrer: str | None = None
+    country: str | None = None
+    city: str | None = None
+
+
+# Analytics columns broken down in url_daily_facets
+FACET_DIMENSIONS = ("device", "browser", "os", "country", "referrer")
+
+# Click row keys written to `analytics` as they are; user_agent and referrer
+# are stored as dimension table keys
+RAW_COLUMNS = (
+    "url_id", "timestamp", "ip_address", "visitor_id", "country", "city", "device", "browser", "os",
+)
+
+
+def analytics_row(row: dict) -> dict:
+    """The `analytics` insert values for a click row."""
+    values = {column: row[column] for column in RAW_COLUMNS}
+    values["user_agent_id"] = user_agents.key(row["user_agent"])
+    values["referrer_id"] = referrers.key(row["referrer"])
+    return values
+
+
+def referrer_host(referrer: str | None) -> str | None:
+    """Referrers are rolled up by host - full URLs are too high-cardinality."""
+    if not referrer:
+        return None
+    try:
+        return urlparse(referrer).hostname
+    except ValueError:
+        return None
+
+
+def click_day(timestamp: datetime) -> date:
+    """The UTC day a click is rolled up under."""
+    if timestamp.tzinfo is None:
+        return timestamp.date()
+    return timestamp.astimezone(timezone.utc).date()
+
+
+def click_hour(timestamp: datetime) -> datetime:
+    """The UTC hour a click is rolled up under."""
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+Granularity = Literal["hour", "day", "week", "month"]
+
+BUCKET_LENGTHS = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+    "month": timedelta(days=28),  # Shortest month, for the bucket count limit
+}
+BUCKET_LABELS = {"hour": "%b %d %H:00", "day": "%b %d", "week": "%b %d", "month": "%b %Y"}
+# Zones whose days are UTC days, so whole days can be read from url_daily_stats
+UTC_ZONES = {"UTC", "Etc/UTC", "GMT", "Etc/GMT"}
+
+
+def truncate_bucket(local: datetime, granularity: Granularity) -> datetime:
+    """Start of the bucket holding a naive local time, like Postgres date_trunc."""
+    local = local.replace(minute=0, second=0, microsecond=0)
+    if granularity == "hour":
+        return local
+    local = local.replace(hour=0)
+    if granularity == "week":
+        return local - timedelta(days=local.weekday())
+    if granularity == "month":
+        return local.replace(day=1)
+    return local
+
+
+def next_bucket(local: datetime, granularity: Granularity) -> datetime:
+    if granularity == "month":
+        index = local.year * 12 + local.month
+        return local.replace(year=index // 12, month=index % 12 + 1)
+    return local + BUCKET_LENGTHS[granularity]
+
+
+class ResolvedRange(NamedTuple):
+    start: datetime
+    end: datetime
+    granularity: Granularity
+    tz: ZoneInfo
+
+    def buckets(self) -> list[datetime]:
+        """Naive local start of every bucket overlapping the range, for zero-filling."""
+        if self.granularity == "hour":
+            # Step through real hours so DST gaps and repeats match the database
+            current = self.start
+            buckets = []
+            while current < self.end:
+                local = truncate_bucket(current.astimezone(self.tz).replace(tzinfo=None), "hour")
+                if not buckets or buckets[-1] != local:
+                    buckets.append(local)
+                current += BUCKET_LENGTHS["hour"]
+            return buckets
+        current = truncate_bucket(self.start.astimezone(self.tz).replace(tzinfo=None), self.granularity)
+        last = self.end.astimezone(self.tz).replace(tzinfo=None)
+        buckets = []
+        while current < last:
+            buckets.append(current)
+            current = next_bucket(current, self.granularity)
+        return buckets
+
+    def split_hours(self) -> list[datetime]:
+        """
+        UTC hours that a bucket boundary or an end of the range falls inside.
+
+        Hourly rollups can't be divided, so the series reads these hours from
+        raw clicks. Only zones whose UTC offset isn't a whole number of hours
+        (Asia/Kolkata, Asia/Kathmandu) have any.
+        """
+        edges = [self.start, self.end] + [
+            bucket.replace(tzinfo=self.tz).astimezone(timezone.utc) for bucket in self.buckets()
+        ]
+        return sorted({
+            click_hour(edge) for edge in edges
+            if self.start <= edge <= self.end and click_hour(edge) != edge
+        })
+
+
+class AnalyticsRange(NamedTuple):
+    """
+    The optional from/to/granularity/tz of an analytics request, as given.
+
+    Kept unresolved so it can be part of a cache key; when nothing is given
+    the dashboard keeps its original shape (lifetime totals, last 7 days).
+    """
+
+    start: datetime | None = None
+    end: datetime | None = None
+    granularity: Granularity | None = None
+    tz: str | None = None
+
+    @property
+    def is_default(self) -> bool:
+        return self == AnalyticsRange()
+
+    def resolve(self) -> ResolvedRange:
+        """
+        Fill in defaults (the last 7 days by day, in UTC) and validate.
+
+        Naive timestamps are taken to be in `tz`. The range is widened to
+        whole hours of `tz`, which start mid-way through a UTC hour in zones
+        like Asia/Kolkata. Raises ValueError.
+        """
+        try:
+            tz = ZoneInfo(self.tz or "UTC")
+        except (ZoneInfoNotFoundError, ValueError):
+            raise ValueError(f"Unknown time zone: {self.tz}")
+        granularity = self.granularity or "day"
+
+        def aware(value: datetime) -> datetime:
+            return value.replace(tzinfo=tz) if value.tzinfo is None else value
+
+        def local_hour(value: datetime) -> datetime:
+            local = value.astimezone(tz).replace(minute=0, second=0, microsecond=0)
+            return local.astimezone(timezone.utc)
+
+        end = aware(self.end) if self.end else datetime.now(timezone.utc)
+        start = aware(self.start) if self.start else end - timedelta(days=7)
+        if start >= end:
+            raise ValueError("'from' must be before 'to'")
+        start = local_hour(start)
+        if local_hour(end) < end:
+            end = local_hour(end) + BUCKET_LENGTHS["hour"]
+        if (end - start) / BUCKET_LENGTHS[granularity] > settings.analytics_max_buckets:
+            raise ValueError(
+                f"At most {settings.analytics_max_buckets} buckets - use a coarser granularity"
+            )
+        return ResolvedRange(start, end, granularity, tz)
+
+
+# All dashboard sections in one round trip, tagged by `section`:
+#   total    - clicks across all days (the () grouping set of `daily`)
+#   day      - clicks per day since :start_day
+#   country, device - clicks per facet value, read from url_daily_facets once
+#   visitors - exact distinct visitor ids, only scanned while total <= :exact_threshold
+#   sketch   - daily HyperLogLog sketches, only read above the threshold
+#   recent   - the five latest raw clicks
+# The threshold conditions only depend on the `total` CTE, so Postgres evaluates
+# them once as one-time filters and skips the branch it doesn't need.
+ANALYTICS_SQL = text("""
+    WITH daily AS (
+        SELECT day, sum(clicks) AS clicks, GROUPING(day) AS is_total
+        FROM url_daily_stats
+        WHERE url_id = ANY(CAST(:url_ids AS BIGINT[]))
+        GROUP BY GROUPING SETS ((), (day))
+    ),
+    total AS (
+        SELECT coalesce(max(clicks) FILTER (WHERE is_total = 1), 0) AS clicks FROM daily
+    )
+    SELECT 'total' AS section, NULL::text AS label, NULL::date AS day, clicks,
+           NULL::bytea AS visitor_sketch, NULL::timestamptz AS "timestamp",
+           NULL::text AS browser, NULL::text AS os, NULL::text AS city, NULL::text AS country
+    FROM total
+    UNION ALL
+    SELECT 'day', NULL, day, clicks, NULL, NULL, NULL, NULL, NULL, NULL
+    FROM daily
+    WHERE is_total = 0 AND day >= :start_day
+    UNION ALL
+    SELECT dimension, value, NULL, sum(clicks), NULL, NULL, NULL, NULL, NULL, NULL
+    FROM url_daily_facets
+    WHERE url_id = ANY(CAST(:url_ids AS BIGINT[])) AND dimension IN ('country', 'device')
+    GROUP BY dimension, value
+    UNION ALL
+    SELECT 'visitors', NULL, NULL, count(DISTINCT visitor_id), NULL, NULL, NULL, NULL, NULL, NULL
+    FROM analytics
+    WHERE url_id = ANY(CAST(:url_ids AS BIGINT[]))
+      AND (SELECT clicks FROM total) <= :exact_threshold
+    UNION ALL
+    SELECT 'sketch', NULL, NULL, NULL, visitor_sketch, NULL, NULL, NULL, NULL, NULL
+    FROM url_daily_stats
+    WHERE url_id = ANY(CAST(:url_ids AS BIGINT[]))
+      AND visitor_sketch IS NOT NULL
+      AND (SELECT clicks FROM total) > :exact_threshold
+    UNION ALL
+    (
+        SELECT 'recent', NULL, NULL, NULL, NULL, "timestamp", browser, os, city, country
+        FROM analytics
+        WHERE url_id = ANY(CAST(:url_ids AS BIGINT[]))
+        ORDER BY "timestamp" DESC
+        LIMIT 5
+    )
+""")
+
+
+# ANALYTICS_SQL for an explicit time range of whole local hours. The series
+# comes from whole UTC days in url_daily_stats between :whole_start and
+# :whole_end (only when buckets line up with UTC days), raw clicks in the
+# :split_hours a bucket boundary or range end falls inside (only in zones with
+# a UTC offset that isn't a whole number of hours) and url_hourly_stats for
+# everything else. Hourly rows are pruned with the raw clicks by the
+# old-analytics cleanup. Breakdowns and visitor sketches are per day, so
+# they cover the UTC days overlapping the range; `days` is their click total.
+ANALYTICS_RANGE_SQL = text("""
+    WITH series AS (
+        SELECT hour AS ts, clicks
+        FROM url_hourly_stats
+        WHERE url_id = ANY(CAST(:url_ids AS BIGINT[]))
+          AND hour >= :start AND hour < :end
+          AND NOT (hour >= :whole_start AND hour < :whole_end)
+          AND hour <> ALL(CAST(:split_hours AS TIMESTAMPTZ[]))
+        UNION ALL
+        SELECT a."timestamp", 1
+        FROM analytics a
+        JOIN unnest(CAST(:split_hours AS TIMESTAMPTZ[])) AS split(hour)
+          ON a."timestamp" >= split.hour AND a."timestamp" < split.hour + interval '1 hour'
+        WHERE a.url_id = ANY(CAST(:url_ids AS BIGINT[]))
+          AND a."timestamp" >= :start AND a."timestamp" < :end
+        UNION ALL
+        SELECT CAST(day AS timestamp) AT TIME ZONE 'UTC', clicks
+        FROM url_daily_stats
+        WHERE url_id = ANY(CAST(:url_ids AS BIGINT[]))
+          AND day >= :whole_start_day AND day < :whole_end_day
+    ),
+    buckets AS (
+        SELECT date_trunc(CAST(:granularity AS text), ts AT TIME ZONE CAST(:tz AS text)) AS bucket,
+               sum(clicks) AS clicks
+        FROM series
+        GROUP BY 1
+    ),
+    total AS (
+        SELECT coalesce(sum(clicks), 0) AS clicks FROM buckets
+    )
+    SELECT 'total' AS section, NULL::text AS label, NULL::timestamp AS bucket, clicks,
+           NULL::bytea AS visitor_sketch, NULL::timestamptz AS "timestamp",
+           NULL::text AS browser, NULL::text AS os, NULL::text AS city, NULL::text AS country
+    FROM total
+    UNION ALL
+    SELECT 'bucket', NULL, bucket, clicks, NULL, NULL, NULL, NULL, NULL, NULL
+    FROM buckets
+    UNION ALL
+    SELECT 'days', NULL, NULL, coalesce(sum(clicks), 0), NULL, NULL, NULL, NULL, NULL, NULL
+    FROM url_daily_stats
+    WHERE url_id = ANY(CAST(:url_ids AS BIGINT[]))
+      AND day >= :first_day AND day <= :last_day
+    UNION ALL
+    SELECT dimension, value, NULL, sum(clicks), NULL, NULL, NULL, NULL, NULL, NULL
+    FROM url_daily_facets
+    WHERE url_id = ANY(CAST(:url_ids AS BIGINT[])) AND dimension IN ('country', 'device')
+      AND day >= :first_day AND day <= :last_day
+    GROUP BY dimension, value
+    UNION ALL
+    SELECT 'visitors', NULL, NULL, count(DISTINCT visitor_id), NULL, NULL, NULL, NULL, NULL, NULL
+    FROM analytics
+    WHERE url_id = ANY(CAST(:url_ids AS BIGINT[]))
+      AND "timestamp" >= :start AND "timestamp" < :end
+      AND (SELECT clicks FROM total) <= :exact_threshold
+    UNION ALL
+    SELECT 'sketch', NULL, NULL, NULL, visitor_sketch, NULL, NULL, NULL, NULL, NULL
+    FROM url_daily_stats
+    WHERE url_id = ANY(CAST(:url_ids AS BIGINT[]))
+      AND day >= :first_day AND day <= :last_day
+      AND visitor_sketch IS NOT NULL
+      AND (SELECT clicks FROM total) > :exact_threshold
+    UNION ALL
+    (
+        SELECT 'recent', NULL, NULL, NULL, NULL, "timestamp", browser, os, city, country
+        FROM analytics
+        WHERE url_id = ANY(CAST(:url_ids AS BIGINT[]))
+          AND "timestamp" >= :start AND "timestamp" < :end
+        ORDER BY "timestamp" DESC
+        LIMIT 5
+    )
+""")
+
+
+def range_params(resolved: ResolvedRange) -> dict:
+    """Bind parameters for ANALYTICS_RANGE_SQL."""
+    start, end = resolved.start, resolved.end
+    whole_start = whole_end = start  # Empty: read every hour from url_hourly_stats
+    if resolved.tz.key in UTC_ZONES and resolved.granularity != "hour":
+        first_midnight = datetime.combine(click_day(start), datetime.min.time(), timezone.utc)
+        if first_midnight < start:
+            first_midnight += timedelta(days=1)
+        last_midnight = datetime.combine(click_day(end), datetime.min.time(), timezone.utc)
+        if first_midnight < last_midnight:
+            whole_start, whole_end = first_midnight, last_midnight
+    return {
+        "start": start,
+        "end": end,
+        "whole_start": whole_start,
+        "whole_end": whole_end,
+        "whole_start_day": click_day(whole_start),
+        "whole_end_day": click_day(whole_end),
+        "split_hours": resolved.split_hours(),
+        "first_day": click_day(start),
+        "last_day": click_day(end - timedelta(microseconds=1)),
+        "granularity": resolved.granularity,
+        "tz": resolved.tz.key,
+    }
+
 
 class AnalyticsService:
     def __init__(self, db: AsyncSession):
@@ -28,32 +382,155 @@ class AnalyticsService:
         referrer: str | None = None,
     ) -> Analytics:
         """Log a click event."""
-        device = None
-        browser = None
-        os = None
-
-        if user_agent:
-            ua = parse(user_agent)
-            device = "Mobile" if ua.is_mobile else ("Tablet" if ua.is_tablet else "Desktop")
-            browser = ua.browser.family
-            os = ua.os.family
-
-        analytics = Analytics(
-            url_id=url_id,
-            ip_address=ip_address,
-            user_agent=user_agent,
-            country=country,
-            city=city,
-            device=device,
-            browser=browser,
-            os=os,
-            referrer=referrer,
-        )
+        device, browser, os = ua_classifier.classify(user_agent)
+        ip_address = normalize_ip(ip_address)
+        row = {
+            "url_id": url_id,
+            "timestamp": utcnow(),
+            "ip_address": ip_address,
+            "visitor_id": visitor_id(ip_address, user_agent),
+            "user_agent": user_agent,
+            "country": country,
+            "city": city,
+            "device": device,
+            "browser": browser,
+            "os": os,
+            "referrer": referrer,
+        }
+
+        new_agents = await user_agents.intern(self.db, [user_agent])
+        new_referrers = await referrers.intern(self.db, [referrer])
+        analytics = Analytics(**analytics_row(row))
         self.db.add(analytics)
+        await self._update_rollups([row])
         await self.db.commit()
+        user_agents.remember(new_agents)
+        referrers.remember(new_referrers)
         return analytics
 
-    async def get_url_analytics(self, url_id: int, user_id: UUID) -> AnalyticsResponse:
+    async def log_clicks(self, events: list[ClickEvent]) -> int:
+        """Write a batch of click events with a single multi-row insert."""
+        if not events:
+            return 0
+
+        ua_info = await ua_classifier.classify_many(event.user_agent for event in events)
+
+        rows = []
+        for event in events:
+            device, browser, os = ua_info.get(event.user_agent, (None, None, None))
+            ip_address = normalize_ip(event.ip_address)
+            rows.append({
+                "url_id": event.url_id,
+                "timestamp": event.timestamp,
+                "ip_address": ip_address,
+                "visitor_id": visitor_id(ip_address, event.user_agent),
+                "user_agent": event.user_agent,
+                "country": event.country,
+                "city": event.city,
+                "device": device,
+                "browser": browser,
+                "os": os,
+                "referrer": event.referrer,
+            })
+
+        try:
+            await self._insert_rows(rows)
+        except IntegrityError:
+            # A URL was deleted after its clicks were queued - drop just those rows
+            await self.db.rollback()
+            url_ids = {row["url_id"] for row in rows}
+            existing_result = await self.db.execute(select(URL.id).where(URL.id.in_(url_ids)))
+            existing = {row[0] for row in existing_result.fetchall()}
+            rows = [row for row in rows if row["url_id"] in existing]
+            if not rows:
+                return 0
+            await self._insert_rows(rows)
+        return len(rows)
+
+    async def _insert_rows(self, rows: list[dict]) -> None:
+        """Insert raw click rows and fold them into the daily rollups in one transaction."""
+        new_agents = await user_agents.intern(self.db, (row["user_agent"] for row in rows))
+        new_referrers = await referrers.intern(self.db, (row["referrer"] for row in rows))
+        await self.db.execute(insert(Analytics), [analytics_row(row) for row in rows])
+        await self._update_rollups(rows)
+        await self.db.commit()
+        user_agents.remember(new_agents)
+        referrers.remember(new_referrers)
+
+    async def _update_rollups(self, rows: list[dict]) -> None:
+        """Add click rows to url_daily_stats / url_daily_facets."""
+        daily: Counter = Counter()
+        hourly: Counter = Counter()
+        visitors: dict[tuple, set[int]] = {}
+        facets: Counter = Counter()
+        for row in rows:
+            key = (row["url_id"], click_day(row["timestamp"]))
+            daily[key] += 1
+            hourly[(row["url_id"], click_hour(row["timestamp"]))] += 1
+            if row["visitor_id"] is not None:
+                visitors.setdefault(key, set()).add(row["visitor_id"])
+            for dimension in FACET_DIMENSIONS:
+                value = row[dimension]
+                if dimension == "referrer":
+                    value = referrer_host(value)
+                if value:
+                    facets[key + (dimension, value)] += 1
+
+        # Sorted so concurrent writers lock rollup rows in the same order.
+        # The upsert locks each day row for the rest of the transaction, so the
+        # returned sketches can be merged and written back without lost updates.
+        stmt = pg_insert(URLDailyStats)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[URLDailyStats.url_id, URLDailyStats.day],
+            set_={"clicks": URLDailyStats.clicks + stmt.excluded.clicks},
+        ).returning(URLDailyStats.url_id, URLDailyStats.day, URLDailyStats.visitor_sketch)
+        result = await self.db.execute(stmt, [
+            {"url_id": url_id, "day": day, "clicks": clicks}
+            for (url_id, day), clicks in sorted(daily.items())
+        ])
+
+        sketch_updates = []
+        for url_id, day, stored in result.fetchall():
+            day_visitors = visitors.get((url_id, day))
+            if not day_visitors:
+                continue
+            sketch = HyperLogLog.from_bytes(stored) if stored else HyperLogLog(settings.hll_precision)
+            # Visitor ids are already uniform 64-bit hashes
+            for visitor in day_visitors:
+                sketch.add_hash(visitor & UINT64_MASK)
+            sketch_updates.append({"url_id": url_id, "day": day, "visitor_sketch": sketch.to_bytes()})
+        if sketch_updates:
+            await self.db.execute(update(URLDailyStats), sketch_updates)
+
+        stmt = pg_insert(URLHourlyStats)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[URLHourlyStats.url_id, URLHourlyStats.hour],
+            set_={"clicks": URLHourlyStats.clicks + stmt.excluded.clicks},
+        )
+        await self.db.execute(stmt, [
+            {"url_id": url_id, "hour": hour, "clicks": clicks}
+            for (url_id, hour), clicks in sorted(hourly.items())
+        ])
+
+        if facets:
+            stmt = pg_insert(URLDailyFacet)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[
+                    URLDailyFacet.url_id,
+                    URLDailyFacet.day,
+                    URLDailyFacet.dimension,
+                    URLDailyFacet.value,
+                ],
+                set_={"clicks": URLDailyFacet.clicks + stmt.excluded.clicks},
+            )
+            await self.db.execute(stmt, [
+                {"url_id": url_id, "day": day, "dimension": dimension, "value": value, "clicks": clicks}
+                for (url_id, day, dimension, value), clicks in sorted(facets.items())
+            ])
+
+    async def get_url_analytics(
+        self, url_id: int, user_id: UUID, range_: AnalyticsRange = AnalyticsRange()
+    ) -> AnalyticsResponse:
         """Get analytics for a specific URL."""
         # Verify ownership
         url_result = await self.db.execute(
@@ -63,15 +540,24 @@ class AnalyticsService:
         if not url:
             raise ValueError("URL not found")
 
-        return await self._build_analytics_response(url_id)
+        return await self._build_analytics_response(url_id, range_=range_)
 
-    async def get_user_analytics(self, user_id: UUID) -> AnalyticsResponse:
-        """Get aggregated analytics for all user URLs."""
-        # Get all user URL IDs
+    async def get_user_url_ids(self, user_id: UUID) -> list[int]:
+        """IDs of all URLs owned by a user."""
         urls_result = await self.db.execute(
             select(URL.id).where(URL.user_id == user_id)
         )
-        url_ids = [row[0] for row in urls_result.fetchall()]
+        return [row[0] for row in urls_result.fetchall()]
+
+    async def get_user_analytics(
+        self,
+        user_id: UUID,
+        url_ids: list[int] | None = None,
+        range_: AnalyticsRange = AnalyticsRange(),
+    ) -> AnalyticsResponse:
+        """Get aggregated analytics for all user URLs (`url_ids` if already known)."""
+        if url_ids is None:
+            url_ids = await self.get_user_url_ids(user_id)
 
         if not url_ids:
             return AnalyticsResponse(
@@ -85,137 +571,137 @@ class AnalyticsService:
                 recent_activity=[],
             )
 
-        return await self._build_analytics_response(url_ids=url_ids)
+        return await self._build_analytics_response(url_ids=url_ids, range_=range_)
 
     async def _build_analytics_response(
-        self, url_id: int | None = None, url_ids: list[int] | None = None
+        self,
+        url_id: int | None = None,
+        url_ids: list[int] | None = None,
+        range_: AnalyticsRange = AnalyticsRange(),
     ) -> AnalyticsResponse:
-        """Build analytics response for single URL or multiple URLs."""
-        if url_id:
-            filter_condition = Analytics.url_id == url_id
-        elif url_ids:
-            filter_condition = Analytics.url_id.in_(url_ids)
-        else:
+        """
+        Build analytics response for single URL or multiple URLs.
+
+        Totals, the click series and breakdowns come from the rollup tables,
+        which the ingestion path updates in the same transaction as the raw rows.
+        Everything is fetched with a single round trip: ANALYTICS_SQL for the
+        default dashboard, ANALYTICS_RANGE_SQL when a time range is given.
+        """
+        if not url_id and not url_ids:
             raise ValueError("Either url_id or url_ids must be provided")
 
-        # Total clicks
-        total_clicks_result = await self.db.execute(
-            select(func.count(Analytics.id)).where(filter_condition)
-        )
-        total_clicks = total_clicks_result.scalar() or 0
+        params = {
+            "url_ids": [url_id] if url_id else list(url_ids),
+            "exact_threshold": settings.unique_visitors_exact_threshold,
+        }
+        resolved = None
+        if range_.is_default:
+            seven_days_ago = datetime.now(timezone.utc) - timedelta(days=7)
+            result = await self.db.execute(
+                ANALYTICS_SQL, {**params, "start_day": seven_days_ago.date()}
+            )
+        else:
+            resolved = range_.resolve()
+            result = await self.db.execute(
+                ANALYTICS_RANGE_SQL, {**params, **range_params(resolved)}
+            )
 
-        # Unique visitors (by IP)
-        unique_visitors_result = await self.db.execute(
-            select(func.count(func.distinct(Analytics.ip_address))).where(filter_condition)
-        )
-        unique_visitors = unique_visitors_result.scalar() or 0
+        total_clicks = 0
+        # Clicks on the days the breakdowns cover, for their percentages
+        facet_total = None
+        unique_visitors = 0
+        visitor_union = None
+        daily_rows = []
+        bucket_clicks = {}
+        country_rows = []
+        device_rows = []
+        recent_rows = []
+        for row in result.fetchall():
+            if row.section == "total":
+                total_clicks = row.clicks
+            elif row.section == "day":
+                daily_rows.append(row)
+            elif row.section == "bucket":
+                bucket_clicks[row.bucket] = row.clicks
+            elif row.section == "days":
+                facet_total = row.clicks
+            elif row.section == "country":
+                country_rows.append(row)
+            elif row.section == "device":
+                device_rows.append(row)
+            elif row.section == "visitors":
+                unique_visitors = int(row.clicks)
+            elif row.section == "sketch":
+                if visitor_union is None:
+                    visitor_union = HyperLogLog(settings.hll_precision)
+                visitor_union.merge(HyperLogLog.from_bytes(row.visitor_sketch))
+            elif row.section == "recent":
+                recent_rows.append(row)
+
+        # Unique visitors (by IP + user agent): exact below the threshold, else the sketch union
+        if total_clicks > settings.unique_visitors_exact_threshold:
+            unique_visitors = visitor_union.count() if visitor_union else 0
 
-        # Click data for last 7 days
-        seven_days_ago = datetime.now(timezone.utc) - timedelta(days=7)
-        click_data = await self._get_click_data(filter_condition, seven_days_ago)
+        if resolved is None:
+            # Click data for last 7 days
+            click_data = [
+                ClickData(date=row.day.strftime("%b %d"), clicks=row.clicks)
+                for row in sorted(daily_rows, key=lambda row: row.day)
+            ]
+            days = 7
+        else:
+            # Every bucket in the range, including the ones without clicks
+            label = BUCKET_LABELS[resolved.granularity]
+            click_data = [
+                ClickData(date=bucket.strftime(label), clicks=bucket_clicks.get(bucket, 0))
+                for bucket in resolved.buckets()
+            ]
+            days = max((resolved.end - resolved.start) / timedelta(days=1), 1)
 
         # Average daily clicks
-        avg_daily_clicks = total_clicks / 7 if total_clicks > 0 else 0
+        avg_daily_clicks = total_clicks / days if total_clicks > 0 else 0
 
-        # Top countries
-        top_countries = await self._get_top_countries(filter_condition, total_clicks)
+        if facet_total is None:
+            facet_total = total_clicks
 
-        # Countries count
-        countries_count_result = await self.db.execute(
-            select(func.count(func.distinct(Analytics.country))).where(
-                and_(filter_condition, Analytics.country.isnot(None))
+        # Top countries
+        country_rows.sort(key=lambda row: (-row.clicks, row.label))
+        top_countries = [
+            CountryData(
+                country=row.label or "Unknown",
+                clicks=row.clicks,
+                percentage=round((row.clicks / facet_total) * 100, 1) if facet_total > 0 else 0,
             )
-        )
-        countries_count = countries_count_result.scalar() or 0
+            for row in country_rows[:5]
+        ]
 
         # Devices
-        devices = await self._get_devices(filter_condition, total_clicks)
+        device_rows.sort(key=lambda row: (-row.clicks, row.label))
+        devices = [
+            DeviceData(
+                type=row.label or "Unknown",
+                percentage=round((row.clicks / facet_total) * 100, 1) if facet_total > 0 else 0,
+            )
+            for row in device_rows
+        ]
 
         # Recent activity
-        recent_activity = await self._get_recent_activity(filter_condition)
+        recent_rows.sort(key=lambda row: row.timestamp, reverse=True)
+        recent_activity = self._format_recent_activity(recent_rows)
 
         return AnalyticsResponse(
             total_clicks=total_clicks,
             unique_visitors=unique_visitors,
             avg_daily_clicks=round(avg_daily_clicks, 1),
-            countries_count=countries_count,
+            countries_count=len(country_rows),
             click_data=click_data,
             top_countries=top_countries,
             devices=devices,
             recent_activity=recent_activity,
         )
 
-    async def _get_click_data(self, filter_condition, start_date: datetime) -> list[ClickData]:
-        """Get click data grouped by date."""
-        result = await self.db.execute(
-            select(
-                func.date(Analytics.timestamp).label("date"),
-                func.count(Analytics.id).label("clicks"),
-            )
-            .where(and_(filter_condition, Analytics.timestamp >= start_date))
-            .group_by(func.date(Analytics.timestamp))
-            .order_by(func.date(Analytics.timestamp))
-        )
-        rows = result.fetchall()
-        return [
-            ClickData(date=row.date.strftime("%b %d"), clicks=row.clicks)
-            for row in rows
-        ]
-
-    async def _get_top_countries(
-        self, filter_condition, total_clicks: int
-    ) -> list[CountryData]:
-        """Get top countries by clicks."""
-        result = await self.db.execute(
-            select(
-                Analytics.country,
-                func.count(Analytics.id).label("clicks"),
-            )
-            .where(and_(filter_condition, Analytics.country.isnot(None)))
-            .group_by(Analytics.country)
-            .order_by(func.count(Analytics.id).desc())
-            .limit(5)
-        )
-        rows = result.fetchall()
-        return [
-            CountryData(
-                country=row.country or "Unknown",
-                clicks=row.clicks,
-                percentage=round((row.clicks / total_clicks) * 100, 1) if total_clicks > 0 else 0,
-            )
-            for row in rows
-        ]
-
-    async def _get_devices(self, filter_condition, total_clicks: int) -> list[DeviceData]:
-        """Get device distribution."""
-        result = await self.db.execute(
-            select(
-                Analytics.device,
-                func.count(Analytics.id).label("count"),
-            )
-            .where(and_(filter_condition, Analytics.device.isnot(None)))
-            .group_by(Analytics.device)
-            .order_by(func.count(Analytics.id).desc())
-        )
-        rows = result.fetchall()
-        return [
-            DeviceData(
-                type=row.device or "Unknown",
-                percentage=round((row.count / total_clicks) * 100, 1) if total_clicks > 0 else 0,
-            )
-            for row in rows
-        ]
-
-    async def _get_recent_activity(self, filter_condition) -> list[RecentActivity]:
-        """Get recent activity."""
-        result = await self.db.execute(
-            select(Analytics)
-            .where(filter_condition)
-            .order_by(Analytics.timestamp.desc())
-            .limit(5)
-        )
-        rows = result.scalars().all()
-        
+    def _format_recent_activity(self, rows) -> list[RecentActivity]:
+        """Format the most recent raw clicks for display."""
         now = datetime.now(timezone.utc)
         activities = []
         
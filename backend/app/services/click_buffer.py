@@ -0,0 +1,130 @@
+import asyncio
+import logging
+
+from sqlalchemy import text
+
+from app.config import get_settings
+from app.database import async_session_maker
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# One statement per flush regardless of how many URLs were clicked
+FLUSH_SQL = text("""
+    UPDATE urls SET click_count = urls.click_count + v.delta
+    FROM unnest(CAST(:ids AS BIGINT[]), CAST(:deltas AS INTEGER[])) AS v(id, delta)
+    WHERE urls.id = v.id
+""")
+
+
+class ClickCounterBuffer:
+    """
+    Write-behind accumulator for URL click counts.
+
+    Redirects add to an in-memory per-url_id delta instead of committing an
+    UPDATE each; a background task folds the deltas into `urls.click_count`
+    every `flush_interval_ms` or as soon as `flush_threshold` clicks are pending.
+    """
+
+    def __init__(self, flush_interval_ms: int, flush_threshold: int):
+        self.flush_interval = flush_interval_ms / 1000
+        self.flush_threshold = flush_threshold
+        self._pending: dict[int, int] = {}
+        self._pending_total = 0
+        # Deltas taken by a flush that has not committed yet - still unflushed for readers
+        self._inflight: dict[int, int] = {}
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+        self.flushes = 0
+        self.flushed_clicks = 0
+        self.failed_flushes = 0
+
+    def add(self, url_id: int, clicks: int = 1) -> None:
+        """Record clicks for a URL."""
+        self._pending[url_id] = self._pending.get(url_id, 0) + clicks
+        self._pending_total += clicks
+        if self._pending_total >= self.flush_threshold:
+            self._wakeup.set()
+
+    def pending_for(self, url_id: int) -> int:
+        """Clicks recorded for a URL that are not in the database yet."""
+        return self._pending.get(url_id, 0) + self._inflight.get(url_id, 0)
+
+    def pending_url_ids(self) -> set[int]:
+        return set(self._pending) | set(self._inflight)
+
+    def pending_total(self, url_ids: set[int] | None = None) -> int:
+        """Unflushed clicks across all URLs, or only the given ones."""
+        if url_ids is None:
+            return sum(self._pending.values()) + sum(self._inflight.values())
+        return sum(self.pending_for(url_id) for url_id in url_ids)
+
+    async def flush(self) -> int:
+        """Write all pending deltas in one batched UPDATE. Returns the clicks flushed."""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+
+            self._inflight, self._pending = self._pending, {}
+            self._pending_total = 0
+            ids = sorted(self._inflight)  # Stable row order across workers
+            deltas = [self._inflight[url_id] for url_id in ids]
+
+            try:
+                async with async_session_maker() as session:
+                    await session.execute(FLUSH_SQL, {"ids": ids, "deltas": deltas})
+                    await session.commit()
+            except Exception:
+                logger.exception("Click counter flush failed, keeping %d URLs for retry", len(ids))
+                self.failed_flushes += 1
+                for url_id, delta in self._inflight.items():
+                    self.add(url_id, delta)
+                return 0
+            finally:
+                flushed = self._inflight
+                self._inflight = {}
+
+            clicks = sum(flushed.values())
+            self.flushes += 1
+            self.flushed_clicks += clicks
+            return clicks
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flusher and write out whatever is still pending."""
+        if self._task is not None:
+            # Let an in-progress flush finish rather than cancelling it mid-statement
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "pending_urls": len(self._pending),
+            "pending_clicks": self.pending_total(),
+            "flushes": self.flushes,
+            "flushed_clicks": self.flushed_clicks,
+            "failed_flushes": self.failed_flushes,
+            "flush_interval_ms": int(self.flush_interval * 1000),
+            "flush_threshold": self.flush_threshold,
+        }
+
+
+click_buffer = ClickCounterBuffer(settings.click_flush_interval_ms, settings.click_flush_threshold)
@@ -0,0 +1,95 @@
+import random
+import time
+from uuid import UUID
+
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models import URL, URLClickShard
+
+settings = get_settings()
+
+
+class HotLinkTracker:
+    """
+    Per-worker click-rate tracker that flags links needing sharded counters.
+
+    Clicks are counted in one-second windows; a link whose rate reaches
+    `threshold` clicks/s stays hot for `hot_seconds` after the last busy window.
+    """
+
+    def __init__(self, threshold: int, hot_seconds: float):
+        self.threshold = threshold
+        self.hot_seconds = hot_seconds
+        self._window_start = time.monotonic()
+        self._counts: dict[int, int] = {}
+        self._hot_until: dict[int, float] = {}
+
+    def _roll(self, now: float) -> None:
+        elapsed = now - self._window_start
+        if elapsed < 1:
+            return
+        for url_id, clicks in self._counts.items():
+            if clicks / elapsed >= self.threshold:
+                self._hot_until[url_id] = now + self.hot_seconds
+        self._counts.clear()
+        self._window_start = now
+        for url_id in [url_id for url_id, until in self._hot_until.items() if until <= now]:
+            del self._hot_until[url_id]
+
+    def record(self, url_id: int) -> bool:
+        """Count a click and return whether the link is currently hot."""
+        now = time.monotonic()
+        self._roll(now)
+        self._counts[url_id] = self._counts.get(url_id, 0) + 1
+        return self._hot_until.get(url_id, 0) > now
+
+    def is_hot(self, url_id: int) -> bool:
+        return self._hot_until.get(url_id, 0) > time.monotonic()
+
+    def stats(self) -> dict:
+        return {
+            "hot_links": len(self._hot_until),
+            "threshold_per_second": self.threshold,
+            "shard_count": settings.click_shard_count,
+        }
+
+
+hot_links = HotLinkTracker(settings.click_shard_threshold, settings.click_shard_hot_seconds)
+
+
+async def increment_shard(db: AsyncSession, url_id: int) -> None:
+    """Add a click to a random shard row of the URL, creating it if needed."""
+    stmt = insert(URLClickShard).values(
+        url_id=url_id,
+        shard=random.randrange(settings.click_shard_count),
+        clicks=1,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[URLClickShard.url_id, URLClickShard.shard],
+        set_={"clicks": URLClickShard.clicks + 1},
+    )
+    await db.execute(stmt)
+
+
+async def shard_clicks(db: AsyncSession, url_ids: list[int]) -> dict[int, int]:
+    """Sharded clicks per URL for the given IDs (URLs without shards are omitted)."""
+    if not url_ids:
+        return {}
+    result = await db.execute(
+        select(URLClickShard.url_id, func.sum(URLClickShard.clicks))
+        .where(URLClickShard.url_id.in_(url_ids))
+        .group_by(URLClickShard.url_id)
+    )
+    return {url_id: int(clicks) for url_id, clicks in result.fetchall()}
+
+
+async def shard_clicks_total(db: AsyncSession, user_id: UUID | None = None) -> int:
+    """Sharded clicks across all URLs, or across one user's URLs."""
+    query = select(func.sum(URLClickShard.clicks))
+    if user_id is not None:
+        query = query.join(URL, URL.id == URLClickShard.url_id).where(URL.user_id == user_id)
+    result = await db.execute(query)
+    return int(result.scalar() or 0)
@@ -0,0 +1,102 @@
+import hashlib
+import logging
+from typing import Iterable
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models import UserAgent, Referrer
+from app.utils import LRUCache
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# SQL for `dimension_id`, for backfills: format with the column name
+DIMENSION_ID_SQL = "('x' || substr(md5({}), 1, 16))::bit(64)::bigint"
+
+
+def dimension_id(value: str) -> int:
+    """Signed 64-bit key of a dimension value: the first 8 bytes of its MD5."""
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big", signed=True)
+
+
+class DimensionInterner:
+    """
+    Maps strings to dimension table keys for analytics rows.
+
+    Keys are hashes, so they're computed without a lookup; the interner only
+    has to make sure each value's row exists. Values known to exist are kept
+    in a per-worker LRU, so steady-state traffic writes no dimension rows.
+    A value whose key already belongs to a different value (a hash
+    collision) is logged once and stored as a NULL key from then on, so its
+    clicks are kept without being mislabeled.
+    """
+
+    def __init__(self, model, maxsize: int):
+        self.model = model
+        self._known = LRUCache(maxsize)
+        # Values that lost their key to another value; too rare to need a bound
+        self._colliding: set[str] = set()
+        self.inserted = 0
+        self.collisions = 0
+
+    def key(self, value: str | None) -> int | None:
+        """The key to store for `value`, or None when it has none (or collided)."""
+        if not value or value in self._colliding:
+            return None
+        return dimension_id(value)
+
+    def _collided(self, value: str, key: int) -> None:
+        if value not in self._colliding:
+            self._colliding.add(value)
+            self.collisions += 1
+            logger.warning(
+                "%s key %d collides with another value; storing NULL for %r",
+                self.model.__tablename__, key, value[:200],
+            )
+
+    async def intern(self, db: AsyncSession, values: Iterable[str | None]) -> list[str]:
+        """
+        Ensure rows exist for `values` in the current transaction.
+
+        Returns the values written, to pass to `remember` once it commits - a
+        rolled back insert must not be cached as existing. Colliding values
+        are not written; `key` maps them to None afterwards.
+        """
+        missing: dict[int, str] = {}
+        for value in values:
+            if not value or value in self._colliding or self._known.get(value) is not None:
+                continue
+            key = dimension_id(value)
+            if missing.setdefault(key, value) != value:
+                self._collided(value, key)
+        if not missing:
+            return []
+        # Sorted so concurrent writers lock the same keys in the same order
+        rows = [{"id": key, "value": missing[key]} for key in sorted(missing)]
+        stmt = pg_insert(self.model).values(rows)
+        # Existing rows are skipped unless they hold another value; those are
+        # "updated" to themselves so RETURNING reports their stored value
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[self.model.id],
+            set_={"value": self.model.value},
+            where=self.model.value != stmt.excluded.value,
+        ).returning(self.model.id, self.model.value)
+        result = await db.execute(stmt)
+        for key, stored in result.all():
+            if stored != missing[key]:
+                self._collided(missing.pop(key), key)
+        self.inserted += len(missing)
+        return list(missing.values())
+
+    def remember(self, values: list[str]) -> None:
+        for value in values:
+            self._known.set(value, True)
+
+    def stats(self) -> dict:
+        return {**self._known.stats(), "inserted": self.inserted, "collisions": self.collisions}
+
+
+user_agents = DimensionInterner(UserAgent, settings.dimension_cache_size)
+referrers = DimensionInterner(Referrer, settings.dimension_cache_size)
@@ -0,0 +1,60 @@
+import asyncio
+from collections import deque
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+
+settings = get_settings()
+
+# Reserves `n` IDs from the urls sequence in one round trip
+ALLOCATE_IDS_SQL = text("SELECT nextval(pg_get_serial_sequence('urls', 'id')) FROM generate_series(1, :n)")
+
+
+class IDBlockAllocator:
+    """
+    Hi-lo allocator for `urls.id`.
+
+    Each worker reserves `block_size` IDs from the Postgres sequence with one
+    query and hands them out in-process, so a URL's slug can be derived from its
+    ID before the row is inserted. `nextval` is never rolled back, so blocks
+    reserved by different workers never overlap; unused IDs are simply skipped.
+    IDs are unique but, across workers, not in creation order.
+    """
+
+    def __init__(self, block_size: int):
+        self.block_size = block_size
+        self._ids: deque[int] = deque()
+        self._lock = asyncio.Lock()
+        self.blocks = 0
+
+    async def _reserve(self, db: AsyncSession, n: int) -> list[int]:
+        result = await db.execute(ALLOCATE_IDS_SQL, {"n": n})
+        return list(result.scalars())
+
+    async def next_id(self, db: AsyncSession) -> int:
+        """One ID, reserving a new block when this worker's block is used up."""
+        if not self._ids:
+            async with self._lock:
+                # Another request may have refilled the block while we waited
+                if not self._ids:
+                    self._ids.extend(await self._reserve(db, self.block_size))
+                    self.blocks += 1
+        return self._ids.popleft()
+
+    async def take(self, db: AsyncSession, n: int) -> list[int]:
+        """`n` IDs; large requests are reserved directly instead of via the block."""
+        if n >= self.block_size:
+            return await self._reserve(db, n)
+        return [await self.next_id(db) for _ in range(n)]
+
+    def stats(self) -> dict:
+        return {
+            "block_size": self.block_size,
+            "blocks_reserved": self.blocks,
+            "remaining_in_block": len(self._ids),
+        }
+
+
+url_ids = IDBlockAllocator(settings.url_id_block_size)
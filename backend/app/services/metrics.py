@@ -0,0 +1,36 @@
+import os
+
+from app.database import pool_stats
+from app.utils import ua_classifier
+from app.services.slug_cache import slug_cache
+from app.services.url_service import url_totals_cache
+from app.services.click_buffer import click_buffer
+from app.services.click_shards import hot_links
+from app.services.analytics_ingest import analytics_ingestor
+from app.services.analytics_cache import analytics_cache
+from app.services.analytics_archive import analytics_archive
+from app.services.dimensions import user_agents, referrers
+from app.services.analytics_partitions import analytics_partitions
+from app.services.slug_bloom import slug_bloom
+from app.services.id_allocator import url_ids
+
+
+def collect_metrics() -> dict:
+    """Snapshot of the in-process performance counters for this worker."""
+    return {
+        "pid": os.getpid(),
+        "db_pool": pool_stats(),
+        "slug_cache": slug_cache.stats(),
+        "url_totals_cache": url_totals_cache.stats(),
+        "click_buffer": click_buffer.stats(),
+        "click_shards": hot_links.stats(),
+        "analytics_ingest": analytics_ingestor.stats(),
+        "analytics_cache": analytics_cache.stats(),
+        "analytics_archive": analytics_archive.stats(),
+        "user_agent_dimension": user_agents.stats(),
+        "referrer_dimension": referrers.stats(),
+        "analytics_partitions": analytics_partitions.stats(),
+        "slug_bloom": slug_bloom.stats(),
+        "url_id_allocator": url_ids.stats(),
+        "user_agent_cache": ua_classifier.stats(),
+    }
@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, func
+
+from app.config import get_settings
+from app.database import async_session_maker
+from app.models import URL
+from app.utils import BloomFilter
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Incremental scans go by updated_at, which is set on insert and on renames
+# (IDs come in per-worker blocks, so they aren't in creation order). Rows are
+# stamped before they commit, so each scan re-reads a window before the newest
+# timestamp seen.
+REFRESH_LOOKBACK = timedelta(seconds=60)
+
+
+class SlugBloomFilter:
+    """
+    Per-process negative cache of existing slugs for the redirect path.
+
+    A slug the filter has never seen definitely does not exist, so the redirect
+    can 404 without querying Postgres. Slugs created in this worker are added
+    immediately; slugs created or renamed elsewhere are picked up by a cheap
+    incremental scan (`updated_at` > newest seen) every `refresh_seconds`, so
+    a valid slug is at most that stale. A full rebuild every `rebuild_seconds`
+    drops deleted and renamed-away slugs, which until then only cost a query.
+    Until the first build completes every slug is treated as possibly existing.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        error_rate: float,
+        refresh_seconds: float,
+        rebuild_seconds: float,
+    ):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refresh_seconds = refresh_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self._filter: BloomFilter | None = None
+        self._max_updated_at: datetime | None = None
+        self._rebuilding = False
+        self._added_during_rebuild: list[str] = []
+        self._task: asyncio.Task | None = None
+        self.last_rebuild: float | None = None
+        self.rebuild_duration = 0.0
+        self.rebuilds = 0
+        self.lookups = 0
+        self.rejected = 0
+
+    def might_exist(self, slug: str) -> bool:
+        """False only when the slug is definitely not in the database."""
+        if self._filter is None:
+            return True
+        self.lookups += 1
+        if slug in self._filter:
+            return True
+        self.rejected += 1
+        return False
+
+    def add(self, slug: str) -> None:
+        """Record a slug created or renamed in this worker."""
+        if self._filter is not None:
+            self._filter.add(slug)
+        if self._rebuilding:
+            self._added_during_rebuild.append(slug)
+
+    async def rebuild(self) -> None:
+        """Build a fresh filter from a streaming scan of urls.slug."""
+        started = time.perf_counter()
+        self._rebuilding = True
+        self._added_during_rebuild = []
+        try:
+            async with async_session_maker() as session:
+                total = (await session.execute(select(func.count(URL.id)))).scalar() or 0
+                # Leave headroom so the error rate holds until the next rebuild
+                bloom = BloomFilter(max(self.capacity, total * 2), self.error_rate)
+                max_updated_at = None
+                result = await session.stream(
+                    select(URL.slug, URL.updated_at).execution_options(yield_per=10000)
+                )
+                async for slug, updated_at in result:
+                    bloom.add(slug)
+                    if max_updated_at is None or updated_at > max_updated_at:
+                        max_updated_at = updated_at
+
+            for slug in self._added_during_rebuild:
+                bloom.add(slug)
+            self._filter = bloom
+            self._max_updated_at = max_updated_at
+        finally:
+            self._rebuilding = False
+            self._added_during_rebuild = []
+
+        self.rebuilds += 1
+        self.last_rebuild = time.time()
+        self.rebuild_duration = time.perf_counter() - started
+
+    async def refresh(self) -> None:
+        """Add slugs of rows inserted or renamed since the last scan (e.g. by other workers)."""
+        if self._filter is None:
+            return
+        query = select(URL.slug, URL.updated_at)
+        if self._max_updated_at is not None:
+            query = query.where(URL.updated_at > self._max_updated_at - REFRESH_LOOKBACK)
+        async with async_session_maker() as session:
+            result = await session.execute(query)
+            for slug, updated_at in result:
+                self._filter.add(slug)
+                if self._max_updated_at is None or updated_at > self._max_updated_at:
+                    self._max_updated_at = updated_at
+
+    async def _run(self) -> None:
+        next_rebuild = 0.0
+        while True:
+            try:
+                if time.monotonic() >= next_rebuild:
+                    await self.rebuild()
+                    next_rebuild = time.monotonic() + self.rebuild_seconds
+                else:
+                    await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Slug bloom filter refresh failed")
+            await asyncio.sleep(self.refresh_seconds)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        bloom = self._filter
+        return {
+            "enabled": settings.slug_bloom_enabled,
+            "ready": bloom is not None,
+            "slugs": bloom.count if bloom else 0,
+            "capacity": bloom.capacity if bloom else self.capacity,
+            "memory_bytes": bloom.memory_bytes if bloom else 0,
+            "num_hashes": bloom.num_hashes if bloom else 0,
+            "target_error_rate": self.error_rate,
+            "estimated_error_rate": round(bloom.estimated_error_rate(), 6) if bloom else None,
+            "lookups": self.lookups,
+            "rejected": self.rejected,
+            "rebuilds": self.rebuilds,
+            "last_rebuild": self.last_rebuild,
+            "rebuild_duration_ms": round(self.rebuild_duration * 1000, 1),
+        }
+
+
+slug_bloom = SlugBloomFilter(
+    settings.slug_bloom_capacity,
+    settings.slug_bloom_error_rate,
+    settings.slug_bloom_refresh_seconds,
+    settings.slug_bloom_rebuild_seconds,
+)
@@ -0,0 +1,29 @@
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+from app.config import get_settings
+from app.utils import LRUCache
+
+settings = get_settings()
+
+
+class CachedURL(NamedTuple):
+    """The subset of a URL row the redirect path needs."""
+
+    id: int
+    original_url: str
+    expires_at: datetime | None
+
+    def is_expired(self) -> bool:
+        if not self.expires_at:
+            return False
+        expires_at = self.expires_at
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        return expires_at < datetime.now(timezone.utc)
+
+
+# slug -> CachedURL, consulted by the redirect path before hitting the database.
+# URLService evicts entries on update/delete so alias changes apply immediately
+# in this worker; other workers pick them up once the TTL expires.
+slug_cache = LRUCache(settings.slug_cache_size, settings.slug_cache_ttl_seconds)
@@ -1,15 +1,103 @@
+import base64
+import binascii
 from uuid import UUID
-from datetime import datetime, timezone
-from sqlalchemy import select, func, delete
+from datetime import datetime
+from typing import Literal
+from sqlalchemy import select, func, delete, update, or_, tuple_, text
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models import URL
-from app.schemas import URLCreate, URLUpdate, URLResponse, URLListResponse
-from app.utils import generate_slug
+from app.models import URL, URLClickShard
+from app.models.url import utcnow
+from app.schemas import (
+    URLCreate,
+    URLUpdate,
+    URLResponse,
+    URLListResponse,
+    URLBulkItemResult,
+    URLBulkCreateResponse,
+)
+from app.utils import generate_slug, decode_slug, LRUCache, BoundedVersionMap, like_pattern, search_rank
 from app.config import get_settings
+from app.services.slug_cache import CachedURL, slug_cache
+from app.services.click_buffer import click_buffer
+from app.services.slug_bloom import slug_bloom
+from app.services.analytics_cache import analytics_cache
+from app.services.id_allocator import url_ids
+from app.services.click_shards import hot_links, increment_shard, shard_clicks, shard_clicks_total
 
 settings = get_settings()
 
+# (user_id, list version, search) -> (total, total_clicks) for the URL list.
+# Creating, renaming or deleting a URL bumps the user's version in this worker;
+# clicks show up in the totals once the TTL expires.
+url_totals_cache = LRUCache(settings.url_totals_cache_size, settings.url_totals_cache_ttl_seconds)
+TRACKED_URL_LIST_VERSIONS = 100_000
+_url_list_versions = BoundedVersionMap(TRACKED_URL_LIST_VERSIONS)
+
+
+def invalidate_url_totals(user_id: UUID) -> None:
+    _url_list_versions.bump(user_id)
+
+
+def _slug_lookups(slug: str):
+    """
+    WHERE conditions to try in turn when resolving a slug for a redirect.
+
+    Generated slugs decode back to their URL ID, so they are found by primary
+    key (still checked against the stored slug). Custom aliases, random slugs
+    and slugs made with a different secret fall back to the slug index.
+    """
+    url_id = decode_slug(slug)
+    if url_id is not None:
+        yield (URL.id == url_id, URL.slug == slug)
+    yield (URL.slug == slug,)
+
+
+# A whole bulk batch in one statement; rows whose slug is already taken are skipped
+BULK_INSERT_SQL = text("""
+    INSERT INTO urls (id, slug, original_url, user_id, click_count, created_at, updated_at, expires_at)
+    SELECT v.id, v.slug, v.original_url, CAST(:user_id AS UUID), 0,
+           CAST(:created_at AS TIMESTAMPTZ), CAST(:created_at AS TIMESTAMPTZ), v.expires_at
+    FROM unnest(
+        CAST(:ids AS BIGINT[]),
+        CAST(:slugs AS VARCHAR[]),
+        CAST(:original_urls AS TEXT[]),
+        CAST(:expires_at AS TIMESTAMPTZ[])
+    ) AS v(id, slug, original_url, expires_at)
+    ON CONFLICT (slug) DO NOTHING
+    RETURNING id
+""")
+
+# Generated slugs that collide are regenerated this many times before giving up
+BULK_SLUG_ATTEMPTS = 3
+
+
+def _encode_cursor(url: URL, rank: float | None = None) -> str:
+    """Opaque keyset cursor for the position after `url` (and its search rank)."""
+    parts = [url.created_at.isoformat(), str(url.id)]
+    if rank is not None:
+        parts.insert(0, repr(rank))
+    return base64.urlsafe_b64encode("|".join(parts).encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, ranked: bool) -> tuple:
+    """(created_at, id), or (rank, created_at, id) for search listings."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        parts = raw.split("|")
+        if len(parts) != (3 if ranked else 2):
+            raise ValueError
+        position = (datetime.fromisoformat(parts[-2]), int(parts[-1]))
+        return (float(parts[0]), *position) if ranked else position
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+
+def _search_filter(search: str):
+    search_filter = like_pattern(search)
+    return (URL.original_url.ilike(search_filter)) | (URL.slug.ilike(search_filter))
+
 
 class URLService:
     def __init__(self, db: AsyncSession):
@@ -19,18 +107,23 @@ class URLService:
         """Build the full short URL from a slug."""
         return f"{settings.base_url}/r/{slug}"
 
-    def _url_to_response(self, url: URL) -> URLResponse:
+    def _url_to_response(self, url: URL, sharded_clicks: int = 0) -> URLResponse:
         """Convert a URL model to a response schema."""
         return URLResponse(
             id=url.id,
             slug=url.slug,
             original_url=url.original_url,
             short_url=self._build_short_url(url.slug),
-            click_count=url.click_count,
+            click_count=url.click_count + sharded_clicks + click_buffer.pending_for(url.id),
             created_at=url.created_at,
             expires_at=url.expires_at,
         )
 
+    async def _urls_to_responses(self, urls: list[URL]) -> list[URLResponse]:
+        """Convert URL models to responses, adding their sharded click counts."""
+        sharded = await shard_clicks(self.db, [url.id for url in urls])
+        return [self._url_to_response(url, sharded.get(url.id, 0)) for url in urls]
+
     async def create_url(self, user_id: UUID, data: URLCreate) -> URLResponse:
         """Create a new shortened URL."""
         # Check if custom alias is already taken
@@ -39,25 +132,135 @@ class URLService:
             if existing:
                 raise ValueError("This alias is already taken")
 
-        # Create URL with placeholder slug
+        # The ID comes from this worker's reserved block, so the slug is known
+        # up front and the row is written with a single INSERT
+        url_id = await url_ids.next_id(self.db)
+        created_at = utcnow()
         url = URL(
-            slug="temp",  # Will be updated after we get the ID
+            id=url_id,
+            slug=data.custom_alias or generate_slug(url_id, settings.slug_style),
             original_url=str(data.original_url),
             user_id=user_id,
+            click_count=0,
+            created_at=created_at,
+            updated_at=created_at,
             expires_at=data.expires_at,
         )
         self.db.add(url)
-        await self.db.flush()  # Get the ID without committing
+        try:
+            await self.db.commit()
+        except IntegrityError:
+            await self.db.rollback()
+            if data.custom_alias:
+                # Claimed by a concurrent request since the check above
+                raise ValueError("This alias is already taken")
+            # Derived slugs are unique per ID, so this is a custom alias that
+            # happens to match it (or two random "short" slugs) - go random
+            url.slug = generate_slug(url_id, "short")
+            self.db.add(url)
+            await self.db.commit()
+        slug_bloom.add(url.slug)
+        analytics_cache.invalidate(user_id)
+        invalidate_url_totals(user_id)
+        return self._url_to_response(url)
 
-        # Generate or use custom slug
-        if data.custom_alias:
-            url.slug = data.custom_alias
-        else:
-            url.slug = generate_slug(url.id)
+    async def bulk_create_urls(self, user_id: UUID, items: list[URLCreate]) -> URLBulkCreateResponse:
+        """
+        Create many URLs at once.
 
-        await self.db.commit()
-        await self.db.refresh(url)
-        return self._url_to_response(url)
+        Custom aliases are checked with one query, IDs are reserved from the
+        sequence in one round trip and the rows go in with a single INSERT.
+        Failures are reported per item instead of failing the whole batch.
+        """
+        if len(items) > settings.url_bulk_max_items:
+            raise ValueError(f"At most {settings.url_bulk_max_items} URLs can be created at once")
+
+        errors: dict[int, str] = {}
+        aliases = {item.custom_alias for item in items if item.custom_alias}
+        taken: set[str] = set()
+        if aliases:
+            result = await self.db.execute(select(URL.slug).where(URL.slug.in_(aliases)))
+            taken = set(result.scalars())
+
+        pending: list[int] = []
+        seen: set[str] = set()
+        for index, item in enumerate(items):
+            alias = item.custom_alias
+            if alias in taken:
+                errors[index] = "This alias is already taken"
+            elif alias in seen:
+                errors[index] = "Duplicate alias in this request"
+            else:
+                if alias:
+                    seen.add(alias)
+                pending.append(index)
+
+        created_at = utcnow()
+        created: dict[int, tuple[int, str]] = {}
+        if pending:
+            todo = dict(zip(pending, await url_ids.take(self.db, len(pending))))
+            for attempt in range(BULK_SLUG_ATTEMPTS):
+                # Retries only follow a clash with an existing slug - go random
+                style = settings.slug_style if attempt == 0 else "short"
+                batch = {
+                    index: (url_id, items[index].custom_alias or generate_slug(url_id, style))
+                    for index, url_id in todo.items()
+                }
+                inserted = await self._bulk_insert(user_id, created_at, items, batch)
+                todo = {}
+                for index, (url_id, slug) in batch.items():
+                    if url_id in inserted:
+                        created[index] = (url_id, slug)
+                    elif items[index].custom_alias:
+                        # Claimed by a concurrent request since the alias check
+                        errors[index] = "This alias is already taken"
+                    else:
+                        todo[index] = url_id
+                if not todo:
+                    break
+            for index in todo:
+                errors[index] = "Could not generate a unique slug"
+            await self.db.commit()
+
+        results = []
+        for index, item in enumerate(items):
+            if index not in created:
+                results.append(URLBulkItemResult(index=index, error=errors[index]))
+                continue
+            url_id, slug = created[index]
+            slug_bloom.add(slug)
+            results.append(URLBulkItemResult(index=index, url=URLResponse(
+                id=url_id,
+                slug=slug,
+                original_url=str(item.original_url),
+                short_url=self._build_short_url(slug),
+                click_count=0,
+                created_at=created_at,
+                expires_at=item.expires_at,
+            )))
+
+        if created:
+            analytics_cache.invalidate(user_id)
+            invalidate_url_totals(user_id)
+        return URLBulkCreateResponse(results=results, created=len(created), failed=len(errors))
+
+    async def _bulk_insert(
+        self,
+        user_id: UUID,
+        created_at: datetime,
+        items: list[URLCreate],
+        batch: dict[int, tuple[int, str]],
+    ) -> set[int]:
+        """Insert index -> (id, slug) rows in one statement; returns the IDs inserted."""
+        result = await self.db.execute(BULK_INSERT_SQL, {
+            "user_id": user_id,
+            "created_at": created_at,
+            "ids": [url_id for url_id, _ in batch.values()],
+            "slugs": [slug for _, slug in batch.values()],
+            "original_urls": [str(items[index].original_url) for index in batch],
+            "expires_at": [items[index].expires_at for index in batch],
+        })
+        return set(result.scalars())
 
     async def get_url_by_slug(self, slug: str) -> URL | None:
         """Get a URL by its slug."""
@@ -71,29 +274,91 @@ class URLService:
         )
         return result.scalar_one_or_none()
 
-    async def get_user_urls(self, user_id: UUID, search: str | None = None) -> URLListResponse:
-        """Get all URLs for a user with optional search."""
-        query = select(URL).where(URL.user_id == user_id).order_by(URL.created_at.desc())
-        
+    async def get_url_response(self, url_id: int, user_id: UUID) -> URLResponse | None:
+        """Get a URL response by ID for a specific user."""
+        url = await self.get_url_by_id(url_id, user_id)
+        if not url:
+            return None
+        return (await self._urls_to_responses([url]))[0]
+
+    async def get_user_urls(
+        self,
+        user_id: UUID,
+        search: str | None = None,
+        limit: int = settings.url_page_size,
+        cursor: str | None = None,
+        sort: Literal["newest", "oldest"] = "newest",
+    ) -> URLListResponse:
+        """
+        Get one page of a user's URLs, keyset-paginated on (created_at, id).
+
+        Searches use the trigram indexes and rank best matches first; the rank
+        becomes the leading keyset column.
+        """
+        newest = sort == "newest"
+        keys = [URL.created_at, URL.id]
+        rank = None
+        query = select(URL).where(URL.user_id == user_id)
         if search:
-            search_filter = f"%{search.lower()}%"
-            query = query.where(
-                (URL.original_url.ilike(search_filter)) | 
-                (URL.slug.ilike(search_filter))
-            )
+            query = query.where(_search_filter(search))
+            # Best match first in both sort orders, so oldest-first sorts on -rank
+            rank = search_rank(search, URL.original_url, URL.slug)
+            rank = (rank if newest else -rank).label("rank")
+            query = query.add_columns(rank)
+            keys.insert(0, rank)
+
+        if cursor:
+            position, after = tuple_(*keys), tuple_(*_decode_cursor(cursor, ranked=rank is not None))
+            query = query.where(position < after if newest else position > after)
+        query = query.order_by(*(key.desc() if newest else key for key in keys))
 
-        result = await self.db.execute(query)
-        urls = result.scalars().all()
+        # One extra row tells us whether there is a next page
+        result = await self.db.execute(query.limit(limit + 1))
+        rows = result.all()
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = _encode_cursor(last[0], last[1] if rank is not None else None)
+        urls = [row[0] for row in rows[:limit]]
 
-        # Calculate totals
-        total_clicks = sum(url.click_count for url in urls)
+        total, total_clicks = await self._list_totals(user_id, search)
 
         return URLListResponse(
-            urls=[self._url_to_response(url) for url in urls],
-            total=len(urls),
+            urls=await self._urls_to_responses(urls),
+            total=total,
             total_clicks=total_clicks,
+            next_cursor=next_cursor,
         )
 
+    async def _list_totals(self, user_id: UUID, search: str | None) -> tuple[int, int]:
+        """
+        URL count and clicks across all pages of a listing, cached per worker.
+
+        Clicks include this worker's buffered deltas, like `get_stats`; once
+        flushed they are in the stored counts, so the cached sum stays right.
+        """
+        key = (user_id, _url_list_versions.get(user_id), search)
+        totals = url_totals_cache.get(key)
+        if totals is not None:
+            return totals
+
+        conditions = [URL.user_id == user_id]
+        if search:
+            conditions.append(_search_filter(search))
+        result = await self.db.execute(
+            select(func.count(URL.id), func.coalesce(func.sum(URL.click_count), 0)).where(*conditions)
+        )
+        total, clicks = result.one()
+        sharded_result = await self.db.execute(
+            select(func.coalesce(func.sum(URLClickShard.clicks), 0))
+            .join(URL, URL.id == URLClickShard.url_id)
+            .where(*conditions)
+        )
+        pending = await self._pending_clicks(*conditions)
+        totals = (total, int(clicks) + int(sharded_result.scalar()) + pending)
+        url_totals_cache.set(key, totals)
+        return totals
+
     async def update_url(self, url_id: int, user_id: UUID, data: URLUpdate) -> URLResponse:
         """Update a URL."""
         url = await self.get_url_by_id(url_id, user_id)
@@ -105,14 +370,22 @@ class URLService:
             existing = await self.get_url_by_slug(data.alias)
             if existing:
                 raise ValueError("This alias is already taken")
+            slug_cache.pop(url.slug)
             url.slug = data.alias
+            # Lets other workers' slug Bloom filters find the new alias
+            url.updated_at = utcnow()
+            slug_bloom.add(data.alias)
 
         if data.expires_at is not None:
             url.expires_at = data.expires_at
 
         await self.db.commit()
         await self.db.refresh(url)
-        return self._url_to_response(url)
+        # Drop the cached entry so the new alias/expiry applies on the next redirect
+        slug_cache.pop(url.slug)
+        # Aliases are searchable, so cached search totals may have changed
+        invalidate_url_totals(user_id)
+        return (await self._urls_to_responses([url]))[0]
 
     async def delete_url(self, url_id: int, user_id: UUID) -> bool:
         """Delete a URL."""
@@ -122,26 +395,131 @@ class URLService:
 
         await self.db.delete(url)
         await self.db.commit()
+        slug_cache.pop(url.slug)
+        analytics_cache.invalidate(user_id)
+        invalidate_url_totals(user_id)
         return True
 
-    async def increment_click(self, slug: str) -> URL | None:
-        """Increment click count and return the URL for redirect."""
-        url = await self.get_url_by_slug(slug)
-        if not url:
+    async def resolve_slug(self, slug: str) -> CachedURL | None:
+        """Resolve a slug for redirecting, consulting the slug cache first."""
+        cached = slug_cache.get(slug)
+        if cached:
+            return cached
+
+        if not slug_bloom.might_exist(slug):
+            return None
+
+        # Plain column select - no ORM identity map or object hydration on the hot path
+        row = None
+        for conditions in _slug_lookups(slug):
+            result = await self.db.execute(
+                select(URL.id, URL.original_url, URL.expires_at).where(*conditions)
+            )
+            row = result.first()
+            if row:
+                break
+        if not row:
+            return None
+
+        cached = CachedURL(*row)
+        slug_cache.set(slug, cached)
+        return cached
+
+    async def increment_click(self, slug: str) -> CachedURL | None:
+        """
+        Increment click count and return the URL for redirect.
+
+        Modes (CLICK_INCREMENT_MODE):
+        - 'buffered': resolve through the cache, count in the write-behind buffer
+        - 'direct': resolve through the cache, UPDATE the row by primary key
+        - 'atomic': a single UPDATE ... RETURNING that resolves, checks expiry
+          and increments in one round trip
+        """
+        if settings.click_increment_mode == "atomic":
+            return await self._increment_click_atomic(slug)
+
+        url = await self.resolve_slug(slug)
+        if not url or url.is_expired():
+            return None
+
+        if settings.click_increment_mode == "buffered":
+            click_buffer.add(url.id)
+            return url
+
+        if hot_links.record(url.id):
+            return await self._increment_click_sharded(slug, url)
+
+        result = await self.db.execute(
+            update(URL)
+            .where(URL.id == url.id)
+            .values(click_count=URL.click_count + 1)
+        )
+        await self.db.commit()
+
+        if result.rowcount == 0:
+            # Deleted since it was cached (e.g. by another worker)
+            slug_cache.pop(slug)
             return None
+        return url
 
-        # Check if URL is expired
-        if url.expires_at:
-            expires_at = url.expires_at
-            if expires_at.tzinfo is None:
-                expires_at = expires_at.replace(tzinfo=timezone.utc)
-            if expires_at < datetime.now(timezone.utc):
-                return None
+    async def _increment_click_atomic(self, slug: str) -> CachedURL | None:
+        """Resolve and count a click with one UPDATE ... RETURNING statement."""
+        # Hot links resolve from the cache and spread their writes over shard rows
+        cached = slug_cache.get(slug)
+        if cached and not cached.is_expired() and hot_links.record(cached.id):
+            return await self._increment_click_sharded(slug, cached)
+
+        if not slug_bloom.might_exist(slug):
+            return None
 
-        url.click_count += 1
+        row = None
+        for conditions in _slug_lookups(slug):
+            result = await self.db.execute(
+                update(URL)
+                .where(
+                    *conditions,
+                    or_(URL.expires_at.is_(None), URL.expires_at > func.now()),
+                )
+                .values(click_count=URL.click_count + 1)
+                .returning(URL.id, URL.original_url, URL.expires_at)
+                .execution_options(synchronize_session=False)
+            )
+            row = result.first()
+            if row:
+                break
         await self.db.commit()
+        # Missing and expired links both come back empty - same 404 as before
+        if not row:
+            return None
+
+        url = CachedURL(*row)
+        if not cached:
+            hot_links.record(url.id)
+        slug_cache.set(slug, url)
         return url
 
+    async def _increment_click_sharded(self, slug: str, url: CachedURL) -> CachedURL | None:
+        """Count a click on a hot link in one of its shard rows instead of the URL row."""
+        try:
+            await increment_shard(self.db, url.id)
+            await self.db.commit()
+        except IntegrityError:
+            # Deleted since it was cached (e.g. by another worker)
+            await self.db.rollback()
+            slug_cache.pop(slug)
+            return None
+        return url
+
+    async def _pending_clicks(self, *conditions) -> int:
+        """Buffered clicks not flushed yet, for the URLs matching `conditions`."""
+        pending_ids = click_buffer.pending_url_ids()
+        if not pending_ids:
+            return 0
+        result = await self.db.execute(
+            select(URL.id).where(*conditions, URL.id.in_(pending_ids))
+        )
+        return click_buffer.pending_total({row[0] for row in result.fetchall()})
+
     async def get_stats(self, user_id: UUID) -> dict:
         """Get overall stats for a user."""
         # Total URLs
@@ -155,6 +533,8 @@ class URLService:
             select(func.sum(URL.click_count)).where(URL.user_id == user_id)
         )
         total_clicks = total_clicks_result.scalar() or 0
+        total_clicks += await shard_clicks_total(self.db, user_id)
+        total_clicks += await self._pending_clicks(URL.user_id == user_id)
 
         return {
             "total_urls": total_urls,
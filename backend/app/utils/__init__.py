@@ -1,6 +1,12 @@
 from app.utils.hashing import verify_password, get_password_hash
 from app.utils.jwt import create_access_token, verify_token
-from app.utils.slug import generate_slug, generate_random_slug
+from app.utils.slug import generate_slug, generate_random_slug, encode_id, decode_slug
+from app.utils.cache import LRUCache, BoundedVersionMap
+from app.utils.bloom import BloomFilter
+from app.utils.hyperloglog import HyperLogLog
+from app.utils.user_agent import UserAgentClassifier, ua_classifier
+from app.utils.search import MIN_SEARCH_LENGTH, like_pattern, search_rank
+from app.utils.visitor import UINT64_MASK, normalize_ip, visitor_id
 
 __all__ = [
     "verify_password",
@@ -9,4 +15,18 @@ __all__ = [
     "verify_token",
     "generate_slug",
     "generate_random_slug",
+    "encode_id",
+    "decode_slug",
+    "LRUCache",
+    "BoundedVersionMap",
+    "BloomFilter",
+    "HyperLogLog",
+    "UserAgentClassifier",
+    "ua_classifier",
+    "MIN_SEARCH_LENGTH",
+    "like_pattern",
+    "search_rank",
+    "UINT64_MASK",
+    "normalize_ip",
+    "visitor_id",
 ]
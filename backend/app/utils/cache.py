@@ -0,0 +1,123 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Bounded in-process LRU cache with an optional per-entry TTL.
+
+    Not shared between worker processes - each uvicorn worker keeps its own copy,
+    so entries invalidated in one worker stay visible in others until the TTL expires.
+    """
+
+    def __init__(self, maxsize: int, ttl: float | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[Any, float | None]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a value, refreshing its LRU position. Expired entries count as misses."""
+        item = self._data.get(key, _MISSING)
+        if item is _MISSING:
+            self.misses += 1
+            return default
+
+        value, expires = item
+        if expires is not None and expires <= time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        """Store a value, evicting the least recently used entry when full."""
+        if self.maxsize <= 0:
+            return
+
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl else None
+        self._data[key] = (value, expires)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable) -> Any:
+        """Invalidate a single entry. Returns the removed value, if any."""
+        item = self._data.pop(key, _MISSING)
+        if item is _MISSING:
+            return None
+        self.invalidations += 1
+        return item[0]
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        self.invalidations += len(self._data)
+        self._data.clear()
+
+    def stats(self) -> dict:
+        """Counters for sizing the cache."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+class BoundedVersionMap:
+    """
+    Latest version per key, remembering at most `maxsize` keys.
+
+    Versions only grow - set them from one counter (`bump` uses the map's
+    own). Keys trimmed past the bound, least recently set first, read the
+    floor: the last trimmed version. A forgotten key therefore never reads a
+    version older than the one it had, so anything stamped with an older
+    version still looks stale.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._versions: OrderedDict[Hashable, int] = OrderedDict()
+        self.version = 0
+        self.floor = 0
+
+    def __len__(self) -> int:
+        return len(self._versions)
+
+    def get(self, key: Hashable) -> int:
+        return self._versions.get(key, self.floor)
+
+    def set(self, key: Hashable, version: int) -> None:
+        self._versions[key] = version
+        self._versions.move_to_end(key)
+        while len(self._versions) > self.maxsize:
+            _, self.floor = self._versions.popitem(last=False)
+
+    def bump(self, key: Hashable) -> int:
+        """Give `key` the next version of this map's counter."""
+        self.version += 1
+        self.set(key, self.version)
+        return self.version
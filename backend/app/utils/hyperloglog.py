@@ -0,0 +1,99 @@
+import hashlib
+import math
+
+_SPARSE = 0
+_DENSE = 1
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct counter with mergeable, compact serialization.
+
+    With the default precision of 12 (4096 one-byte registers) the standard
+    error of `count()` is 1.04 / sqrt(4096) ~= 1.6%; about 95% of estimates are
+    within 3.25% of the true value. Small sketches serialize sparsely as
+    (register, rank) pairs, so rarely-clicked URLs cost a few bytes per visitor.
+    """
+
+    def __init__(self, precision: int = 12):
+        self.precision = precision
+        self.num_registers = 1 << precision
+        self.registers = bytearray(self.num_registers)
+
+    def add(self, value: str | bytes) -> None:
+        if isinstance(value, str):
+            value = value.encode()
+        h = int.from_bytes(hashlib.blake2b(value, digest_size=8).digest(), "big")
+        self.add_hash(h)
+
+    def add_hash(self, h: int) -> None:
+        """Add a pre-computed 64-bit hash."""
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def fold(self, precision: int) -> "HyperLogLog":
+        """This sketch at a lower precision, exactly as if it had been built at it."""
+        if precision > self.precision:
+            raise ValueError("Cannot raise the precision of a sketch")
+        shift = self.precision - precision
+        folded = HyperLogLog(precision)
+        for index, rank in enumerate(self.registers):
+            if not rank:
+                continue
+            # The dropped index bits become the leading bits of the rank's input
+            low = index & ((1 << shift) - 1)
+            rank = shift - low.bit_length() + 1 if low else shift + rank
+            target = index >> shift
+            if rank > folded.registers[target]:
+                folded.registers[target] = rank
+        return folded
+
+    def merge(self, other: "HyperLogLog") -> None:
+        """
+        Union another sketch into this one. Sketches of different precision
+        (stored before a precision change) are folded to the lower one.
+        """
+        if other.precision > self.precision:
+            other = other.fold(self.precision)
+        elif other.precision < self.precision:
+            folded = self.fold(other.precision)
+            self.precision = folded.precision
+            self.num_registers = folded.num_registers
+            self.registers = folded.registers
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self) -> int:
+        m = self.num_registers
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        # Linear counting is more accurate for small cardinalities
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+    def to_bytes(self) -> bytes:
+        nonzero = [(i, r) for i, r in enumerate(self.registers) if r]
+        # Sparse pairs take 3 bytes each - switch to dense once that's larger
+        if len(nonzero) * 3 < self.num_registers:
+            out = bytearray([_SPARSE, self.precision])
+            for index, rank in nonzero:
+                out += index.to_bytes(2, "big")
+                out.append(rank)
+            return bytes(out)
+        return bytes([_DENSE, self.precision]) + bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        kind, precision = data[0], data[1]
+        sketch = cls(precision)
+        if kind == _DENSE:
+            sketch.registers = bytearray(data[2:])
+        else:
+            for offset in range(2, len(data), 3):
+                index = int.from_bytes(data[offset:offset + 2], "big")
+                sketch.registers[index] = data[offset + 2]
+        return sketch
@@ -0,0 +1,18 @@
+from sqlalchemy import func
+
+# Trigram indexes can't help with queries shorter than one trigram
+MIN_SEARCH_LENGTH = 3
+
+
+def like_pattern(search: str) -> str:
+    """`%search%` for a trigram-indexed ILIKE, with LIKE wildcards escaped."""
+    search = search.strip()
+    if len(search) < MIN_SEARCH_LENGTH:
+        raise ValueError(f"Search must be at least {MIN_SEARCH_LENGTH} characters")
+    escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def search_rank(search: str, *columns):
+    """Best pg_trgm word similarity of the query to any of the columns (0-1)."""
+    return func.greatest(*(func.word_similarity(search.strip(), column) for column in columns))
@@ -2,6 +2,10 @@ import secrets
 import hashlib
 from typing import Optional
 
+from app.config import get_settings
+
+settings = get_settings()
+
 # Adjectives for readable slugs
 ADJECTIVES = [
     "swift", "bright", "cool", "fast", "quick", "smart", "bold", "calm",
@@ -24,6 +28,14 @@ NOUNS = [
 
 # URL-safe characters for random suffix
 URL_SAFE_CHARS = "23456789abcdefghjkmnpqrstuvwxyz"  # Removed confusing chars: 0, 1, i, l, o
+_CHAR_VALUES = {char: value for value, char in enumerate(URL_SAFE_CHARS)}
+
+# ID codes: (permutation bits, code length). IDs below 2**32 get 7 characters;
+# each tier is the shortest length that fits, so a code's length names its tier.
+CODE_TIERS = ((32, 7), (48, 10), (64, 13))
+FEISTEL_ROUNDS = 4
+MAX_URL_ID = (1 << 63) - 1  # BIGINT
+_CODE_KEY = hashlib.blake2b(settings.slug_secret.encode(), digest_size=32).digest()
 
 
 def _random_suffix(length: int = 4) -> str:
@@ -37,26 +49,102 @@ def _hash_based_selection(url_id: int, items: list) -> str:
     return items[hash_val % len(items)]
 
 
+def _feistel_round(round_index: int, bits: int, half: int) -> int:
+    """Keyed round function, truncated to `bits // 2` bits."""
+    data = bytes((round_index, bits)) + half.to_bytes(4, "big")
+    digest = hashlib.blake2b(data, digest_size=4, key=_CODE_KEY).digest()
+    return int.from_bytes(digest, "big") & ((1 << (bits // 2)) - 1)
+
+
+def _permute(value: int, bits: int) -> int:
+    half_bits = bits // 2
+    left, right = value >> half_bits, value & ((1 << half_bits) - 1)
+    for round_index in range(FEISTEL_ROUNDS):
+        left, right = right, left ^ _feistel_round(round_index, bits, right)
+    return (left << half_bits) | right
+
+
+def _unpermute(value: int, bits: int) -> int:
+    half_bits = bits // 2
+    left, right = value >> half_bits, value & ((1 << half_bits) - 1)
+    for round_index in reversed(range(FEISTEL_ROUNDS)):
+        left, right = right ^ _feistel_round(round_index, bits, left), left
+    return (left << half_bits) | right
+
+
+def encode_id(url_id: int) -> str:
+    """
+    Encode a URL ID as a short, non-sequential code (e.g., x7k9m2p).
+
+    A keyed Feistel permutation of the ID written in URL_SAFE_CHARS, so
+    distinct IDs always give distinct codes and `decode_slug` reverses it.
+    """
+    for bits, length in CODE_TIERS:
+        if 0 <= url_id < 1 << bits and url_id <= MAX_URL_ID:
+            value = _permute(url_id, bits)
+            chars = []
+            for _ in range(length):
+                value, digit = divmod(value, len(URL_SAFE_CHARS))
+                chars.append(URL_SAFE_CHARS[digit])
+            return "".join(reversed(chars))
+    raise ValueError(f"URL ID out of range: {url_id}")
+
+
+def decode_slug(slug: str) -> int | None:
+    """
+    The URL ID a generated slug was derived from, or None if it can't be one.
+
+    Only the code after the last '-' is read, so the result must still be
+    checked against the stored slug (custom aliases can decode by chance).
+    """
+    code = slug.rpartition("-")[2]
+    for bits, length in CODE_TIERS:
+        if len(code) == length:
+            break
+    else:
+        return None
+
+    value = 0
+    for char in code:
+        digit = _CHAR_VALUES.get(char)
+        if digit is None:
+            return None
+        value = value * len(URL_SAFE_CHARS) + digit
+    if value >= 1 << bits:
+        return None
+
+    url_id = _unpermute(value, bits)
+    # An ID always encodes in the shortest tier that fits it
+    if url_id > MAX_URL_ID or len(encode_id(url_id)) != length:
+        return None
+    return url_id
+
+
 def generate_slug(url_id: int, style: str = "readable") -> str:
     """
     Generate a unique, memorable slug for a URL.
     
     Styles:
-    - 'readable': adjective-noun-suffix (e.g., swift-link-x7k9)
+    - 'readable': adjective-noun-code (e.g., swift-link-x7k9m2p)
+    - 'compact': Just the ID code (e.g., x7k9m2p)
+    - 'mixed': noun-code (e.g., spark-x7k9m2p)
     - 'short': Just random characters (e.g., x7k9m2p4)
-    - 'mixed': noun-suffix (e.g., spark-7k9m)
-    """
-    suffix = _random_suffix(4)
     
+    All but 'short' end in the ID's code, so they never collide with each
+    other and the redirect can look them up by primary key.
+    """
     if style == "readable":
-        # Use ID to deterministically pick words + random suffix for uniqueness
+        # Use ID to deterministically pick words; the code makes it unique
         adj = _hash_based_selection(url_id, ADJECTIVES)
         noun = _hash_based_selection(url_id * 31, NOUNS)  # Different hash for variety
-        return f"{adj}-{noun}-{suffix}"
+        return f"{adj}-{noun}-{encode_id(url_id)}"
+    
+    elif style == "compact":
+        return encode_id(url_id)
     
     elif style == "mixed":
         noun = _hash_based_selection(url_id, NOUNS)
-        return f"{noun}-{suffix}"
+        return f"{noun}-{encode_id(url_id)}"
     
     else:  # short
         return _random_suffix(8)
@@ -0,0 +1,76 @@
+import asyncio
+from typing import Iterable
+
+from user_agents import parse
+
+from app.config import get_settings
+from app.utils.cache import LRUCache
+
+settings = get_settings()
+
+UAInfo = tuple[str | None, str | None, str | None]
+_EMPTY: UAInfo = (None, None, None)
+
+
+def _parse_user_agent(user_agent: str) -> UAInfo:
+    ua = parse(user_agent)
+    device = "Mobile" if ua.is_mobile else ("Tablet" if ua.is_tablet else "Desktop")
+    return device, ua.browser.family, ua.os.family
+
+
+class UserAgentClassifier:
+    """
+    Memoized user agent -> (device, browser, os) classification.
+
+    `user_agents.parse` is regex heavy, while real traffic only has a small set of
+    distinct UA strings, so results are kept in a bounded LRU cache.
+    """
+
+    def __init__(self, maxsize: int, parse_in_thread: bool = False):
+        self.parse_in_thread = parse_in_thread
+        self._cache = LRUCache(maxsize)
+
+    def classify(self, user_agent: str | None) -> UAInfo:
+        """Classify a single user agent, parsing inline on a cache miss."""
+        if not user_agent:
+            return _EMPTY
+        info = self._cache.get(user_agent)
+        if info is None:
+            info = _parse_user_agent(user_agent)
+            self._cache.set(user_agent, info)
+        return info
+
+    async def classify_many(self, user_agents: Iterable[str | None]) -> dict[str, UAInfo]:
+        """
+        Classify a batch of user agents, parsing each distinct miss once.
+
+        With `parse_in_thread` the misses are parsed on the default thread pool so a
+        flood of new UA strings doesn't block the event loop.
+        """
+        results: dict[str, UAInfo] = {}
+        misses: list[str] = []
+        for user_agent in set(user_agents):
+            if not user_agent:
+                continue
+            info = self._cache.get(user_agent)
+            if info is None:
+                misses.append(user_agent)
+            else:
+                results[user_agent] = info
+
+        if misses:
+            if self.parse_in_thread:
+                parsed = await asyncio.to_thread(lambda: [_parse_user_agent(ua) for ua in misses])
+            else:
+                parsed = [_parse_user_agent(ua) for ua in misses]
+            for user_agent, info in zip(misses, parsed):
+                self._cache.set(user_agent, info)
+                results[user_agent] = info
+
+        return results
+
+    def stats(self) -> dict:
+        return {**self._cache.stats(), "parse_in_thread": self.parse_in_thread}
+
+
+ua_classifier = UserAgentClassifier(settings.ua_cache_size, settings.ua_parse_in_thread)
@@ -0,0 +1,42 @@
+import hashlib
+import ipaddress
+
+from app.config import get_settings
+
+settings = get_settings()
+
+# `visitor_id` in SQL, for backfills: format with inet and text expressions and
+# bind :salt. host() prints addresses the way `normalize_ip` does.
+VISITOR_ID_SQL = (
+    "('x' || substr(md5(:salt || '|' || host({ip}) || '|' || coalesce({user_agent}, '')), 1, 16))"
+    "::bit(64)::bigint"
+)
+
+UINT64_MASK = (1 << 64) - 1
+
+
+def normalize_ip(value: str | None) -> str | None:
+    """Canonical text of an IP address (as Postgres prints INET), or None if it isn't one."""
+    if not value:
+        return None
+    try:
+        address = ipaddress.ip_address(value)
+    except ValueError:
+        return None
+    if getattr(address, "scope_id", None):
+        return None  # INET has no zone ids (fe80::1%eth0)
+    # Dual-stack listeners report IPv4 clients as ::ffff:a.b.c.d
+    return str(getattr(address, "ipv4_mapped", None) or address)
+
+
+def visitor_id(ip_address: str | None, user_agent: str | None) -> int | None:
+    """
+    Salted signed 64-bit visitor key: the first 8 bytes of MD5(salt|ip|user agent).
+
+    `ip_address` must already be normalized. Clicks without an IP have no
+    visitor. The salt keeps keys from being reversed into IPs by brute force.
+    """
+    if not ip_address:
+        return None
+    digest = hashlib.md5(f"{settings.visitor_id_salt}|{ip_address}|{user_agent or ''}".encode()).digest()
+    return int.from_bytes(digest[:8], "big", signed=True)
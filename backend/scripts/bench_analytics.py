@@ -0,0 +1,238 @@
+"""
+Benchmark the analytics dashboard query.
+
+Seeds a URL with N clicks (1M by default) through the regular ingestion path,
+then times the previous query-per-section implementation against the single
+round trip in AnalyticsService and checks both return the same response.
+
+Usage:
+    python -m scripts.bench_analytics [--clicks 1000000] [--runs 20] [--url-id ID]
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import select, func, and_
+
+from app.database import async_session_maker, engine
+from app.models import User, URL, Analytics, URLDailyStats, URLDailyFacet
+from app.schemas import AnalyticsResponse, ClickData, CountryData, DeviceData, RecentActivity
+from app.services.analytics_service import AnalyticsService, ClickEvent, settings
+from app.utils import HyperLogLog
+from app.utils.hashing import get_password_hash
+
+BATCH_SIZE = 10000
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_2) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.2 Safari/605.1.15",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_2 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Mobile/15E148",
+    "Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Mobile Safari/537.36",
+    "Mozilla/5.0 (X11; Linux x86_64; rv:121.0) Gecko/20100101 Firefox/121.0",
+]
+COUNTRIES = ["US", "GB", "DE", "FR", "IN", "BR", "JP", "KE", "NG", "CA", None]
+REFERRERS = ["https://twitter.com/", "https://www.google.com/search", "https://news.ycombinator.com/", None]
+
+
+async def seed_url(clicks: int) -> int:
+    """Create a benchmark user and URL and ingest `clicks` random clicks for it."""
+    async with async_session_maker() as db:
+        email = "bench@clipurl.local"
+        result = await db.execute(select(User).where(User.email == email))
+        user = result.scalar_one_or_none()
+        if not user:
+            user = User(
+                name="Benchmark",
+                email=email,
+                password_hash=get_password_hash("benchmark123"),
+                is_active=True,
+                email_verified=True,
+            )
+            db.add(user)
+            await db.flush()
+
+        url = URL(
+            slug=f"bench-{random.getrandbits(32):08x}",
+            original_url="https://example.com/benchmark",
+            user_id=user.id,
+        )
+        db.add(url)
+        await db.commit()
+        url_id = url.id
+
+    now = datetime.now(timezone.utc)
+    started = time.perf_counter()
+    for offset in range(0, clicks, BATCH_SIZE):
+        events = [
+            ClickEvent(
+                url_id=url_id,
+                timestamp=now - timedelta(seconds=random.randrange(30 * 86400)),
+                ip_address=f"10.{random.randrange(64)}.{random.randrange(256)}.{random.randrange(256)}",
+                user_agent=random.choice(USER_AGENTS),
+                referrer=random.choice(REFERRERS),
+                country=random.choice(COUNTRIES),
+            )
+            for _ in range(min(BATCH_SIZE, clicks - offset))
+        ]
+        async with async_session_maker() as db:
+            await AnalyticsService(db).log_clicks(events)
+        print(f"  ingested {offset + len(events):,}/{clicks:,}", end="\r")
+    print(f"\n✅ Seeded URL {url_id} in {time.perf_counter() - started:.1f}s")
+    return url_id
+
+
+async def legacy_response(db, url_id: int) -> AnalyticsResponse:
+    """
+    The previous implementation: one query per dashboard section.
+
+    Its queries and formatting as they were, except that exact visitors
+    count `visitor_id` now that it replaced text IPs as the visitor key.
+    """
+    stats_filter = URLDailyStats.url_id == url_id
+    facet_filter = URLDailyFacet.url_id == url_id
+
+    total_clicks = (await db.execute(
+        select(func.sum(URLDailyStats.clicks)).where(stats_filter)
+    )).scalar() or 0
+
+    if total_clicks <= settings.unique_visitors_exact_threshold:
+        unique_visitors = (await db.execute(
+            select(func.count(func.distinct(Analytics.visitor_id))).where(Analytics.url_id == url_id)
+        )).scalar() or 0
+    else:
+        union = HyperLogLog(settings.hll_precision)
+        sketches = await db.stream_scalars(
+            select(URLDailyStats.visitor_sketch)
+            .where(and_(stats_filter, URLDailyStats.visitor_sketch.isnot(None)))
+            .execution_options(yield_per=1000)
+        )
+        async for stored in sketches:
+            union.merge(HyperLogLog.from_bytes(stored))
+        unique_visitors = union.count()
+
+    start_day = (datetime.now(timezone.utc) - timedelta(days=7)).date()
+    daily = await db.execute(
+        select(URLDailyStats.day, func.sum(URLDailyStats.clicks).label("clicks"))
+        .where(and_(stats_filter, URLDailyStats.day >= start_day))
+        .group_by(URLDailyStats.day)
+        .order_by(URLDailyStats.day)
+    )
+
+    async def facet(dimension: str, limit: int | None = None):
+        clicks = func.sum(URLDailyFacet.clicks)
+        query = (
+            select(URLDailyFacet.value, clicks.label("clicks"))
+            .where(and_(facet_filter, URLDailyFacet.dimension == dimension))
+            .group_by(URLDailyFacet.value)
+            .order_by(clicks.desc())
+        )
+        if limit:
+            query = query.limit(limit)
+        return (await db.execute(query)).fetchall()
+
+    countries = await facet("country", limit=5)
+    countries_count = (await db.execute(
+        select(func.count(func.distinct(URLDailyFacet.value))).where(
+            and_(facet_filter, URLDailyFacet.dimension == "country")
+        )
+    )).scalar() or 0
+    devices = await facet("device")
+    recent = await db.execute(
+        select(Analytics)
+        .where(Analytics.url_id == url_id)
+        .order_by(Analytics.timestamp.desc())
+        .limit(5)
+    )
+
+    now = datetime.now(timezone.utc)
+    activities = []
+    for row in recent.scalars().all():
+        timestamp = row.timestamp
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        diff = now - timestamp
+        if diff.seconds < 60:
+            time_ago = "Just now"
+        elif diff.seconds < 3600:
+            time_ago = f"{diff.seconds // 60} min ago"
+        elif diff.seconds < 86400:
+            time_ago = f"{diff.seconds // 3600} hr ago"
+        else:
+            time_ago = f"{diff.days} days ago"
+
+        location_parts = []
+        if row.city:
+            location_parts.append(row.city)
+        if row.country:
+            location_parts.append(row.country)
+        location = ", ".join(location_parts) if location_parts else "Unknown"
+
+        device = f"{row.browser or 'Unknown'} / {row.os or 'Unknown'}"
+
+        activities.append(RecentActivity(time=time_ago, location=location, device=device))
+
+    def pct(clicks):
+        return round((clicks / total_clicks) * 100, 1) if total_clicks > 0 else 0
+
+    return AnalyticsResponse(
+        total_clicks=total_clicks,
+        unique_visitors=unique_visitors,
+        avg_daily_clicks=round(total_clicks / 7 if total_clicks > 0 else 0, 1),
+        countries_count=countries_count,
+        click_data=[ClickData(date=row.day.strftime("%b %d"), clicks=row.clicks) for row in daily],
+        top_countries=[
+            CountryData(country=row.value or "Unknown", clicks=row.clicks, percentage=pct(row.clicks))
+            for row in countries
+        ],
+        devices=[DeviceData(type=row.value or "Unknown", percentage=pct(row.clicks)) for row in devices],
+        recent_activity=activities,
+    )
+
+
+async def time_runs(label: str, runs: int, build) -> tuple[list[float], AnalyticsResponse]:
+    timings = []
+    response = None
+    for _ in range(runs):
+        async with async_session_maker() as db:
+            started = time.perf_counter()
+            response = await build(db)
+            timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"{label:<14} median {statistics.median(timings):8.2f} ms   p95 {p95:8.2f} ms")
+    return timings, response
+
+
+async def main(args) -> None:
+    url_id = args.url_id or await seed_url(args.clicks)
+
+    print(f"\n📊 Analytics for URL {url_id}, {args.runs} runs each\n")
+    _, legacy = await time_runs("per-section", args.runs, lambda db: legacy_response(db, url_id))
+    _, current = await time_runs(
+        "single query", args.runs,
+        lambda db: AnalyticsService(db)._build_analytics_response(url_id),
+    )
+
+    if legacy.model_dump_json() == current.model_dump_json():
+        print("\n✅ Responses are identical")
+    else:
+        print("\n❌ Responses differ")
+        print(f"  per-section:  {legacy.model_dump_json()}")
+        print(f"  single query: {current.model_dump_json()}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clicks", type=int, default=1_000_000, help="clicks to seed")
+    parser.add_argument("--runs", type=int, default=20, help="timed runs per implementation")
+    parser.add_argument("--url-id", type=int, help="benchmark an existing URL instead of seeding one")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,119 @@
+"""
+Before/after EXPLAIN ANALYZE for the analytics indexes (migration 007).
+
+Optionally seeds raw analytics rows, then runs the per-URL and time-range
+queries twice: once with index scans disabled for the session ("before") and
+once normally ("after"), printing plans and execution times. Seeded rows
+are written straight to `analytics`, bypassing the rollup tables, so only
+seed a scratch database.
+
+Usage:
+    python -m scripts.explain_analytics_indexes [--seed 1000000] [--url-id ID] [--plans]
+"""
+import argparse
+import asyncio
+import re
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import text
+
+from app.database import engine
+
+SEED_SQL = text("""
+    WITH existing AS (SELECT array_agg(id) AS ids FROM urls)
+    INSERT INTO analytics (url_id, timestamp, ip_address, visitor_id, country, device, browser, os)
+    SELECT
+        CASE WHEN g % 10 = 0 THEN :url_id ELSE ids[1 + g % cardinality(ids)] END,
+        now() - (random() * interval '400 days'),
+        CAST('10.' || (g % 64) || '.' || (g % 251) || '.' || (g % 241) AS inet),
+        g % 1000000,
+        CASE WHEN g % 3 = 0 THEN NULL ELSE (ARRAY['US', 'GB', 'DE', 'IN', 'KE'])[1 + g % 5] END,
+        CASE WHEN g % 4 = 0 THEN NULL ELSE (ARRAY['Desktop', 'Mobile', 'Tablet'])[1 + g % 3] END,
+        'Chrome',
+        'Linux'
+    FROM generate_series(1, :rows) AS g, existing
+""")
+
+QUERIES = {
+    "recent activity": """
+        SELECT timestamp, browser, os, city, country FROM analytics
+        WHERE url_id = :url_id ORDER BY timestamp DESC LIMIT 5
+    """,
+    "exact unique visitors": """
+        SELECT count(DISTINCT visitor_id) FROM analytics WHERE url_id = :url_id
+    """,
+    "country facet": """
+        SELECT country, count(*) FROM analytics
+        WHERE url_id = :url_id AND country IS NOT NULL GROUP BY country
+    """,
+    "device facet": """
+        SELECT device, count(*) FROM analytics
+        WHERE url_id = :url_id AND device IS NOT NULL GROUP BY device
+    """,
+    "cleanup range": """
+        SELECT count(*) FROM analytics WHERE timestamp < now() - interval '365 days'
+    """,
+}
+
+DISABLE_INDEXES = (
+    "SET LOCAL enable_indexscan = off",
+    "SET LOCAL enable_indexonlyscan = off",
+    "SET LOCAL enable_bitmapscan = off",
+)
+
+
+async def explain(conn, sql: str, url_id: int, use_indexes: bool) -> tuple[float, list[str]]:
+    """Run EXPLAIN ANALYZE in a rolled-back transaction; returns (ms, plan lines)."""
+    trans = await conn.begin()
+    try:
+        if not use_indexes:
+            for statement in DISABLE_INDEXES:
+                await conn.execute(text(statement))
+        result = await conn.execute(
+            text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"), {"url_id": url_id}
+        )
+        plan = [row[0] for row in result.fetchall()]
+    finally:
+        await trans.rollback()
+    execution = next(line for line in plan if line.startswith("Execution Time"))
+    return float(re.search(r"([\d.]+) ms", execution).group(1)), plan
+
+
+async def main(args) -> None:
+    async with engine.connect() as conn:
+        url_id = args.url_id
+        if url_id is None:
+            url_id = (await conn.execute(text("SELECT min(id) FROM urls"))).scalar()
+            if url_id is None:
+                print("❌ No URLs found - create one (python -m scripts.seed) first")
+                return
+
+        if args.seed:
+            print(f"🌱 Seeding {args.seed:,} analytics rows (10% for URL {url_id})...")
+            await conn.execute(SEED_SQL, {"url_id": url_id, "rows": args.seed})
+            await conn.execute(text("ANALYZE analytics"))
+        await conn.commit()
+
+        print(f"\n📊 URL {url_id}\n")
+        print(f"{'query':<24}{'before (ms)':>14}{'after (ms)':>14}")
+        for name, sql in QUERIES.items():
+            before, before_plan = await explain(conn, sql, url_id, use_indexes=False)
+            after, after_plan = await explain(conn, sql, url_id, use_indexes=True)
+            print(f"{name:<24}{before:>14.2f}{after:>14.2f}")
+            if args.plans:
+                print("\n  before:\n    " + "\n    ".join(before_plan))
+                print("\n  after:\n    " + "\n    ".join(after_plan) + "\n")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=0, help="raw analytics rows to insert first")
+    parser.add_argument("--url-id", type=int, help="URL to query (default: the oldest URL)")
+    parser.add_argument("--plans", action="store_true", help="print the full query plans")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,71 @@
+from datetime import date, datetime, timedelta, timezone
+
+from app.services.analytics_service import AnalyticsRange, range_params
+
+
+def utc(*args: int) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def test_kathmandu_day_range_reads_edge_hours_from_raw_clicks():
+    resolved = AnalyticsRange(datetime(2026, 10, 1), datetime(2026, 10, 3), "day", "Asia/Kathmandu").resolve()
+
+    # Kathmandu is UTC+5:45, so its midnights are a quarter past a UTC hour
+    assert resolved.start == utc(2026, 9, 30, 18, 15)
+    assert resolved.end == utc(2026, 10, 2, 18, 15)
+    assert resolved.buckets() == [datetime(2026, 10, 1), datetime(2026, 10, 2)]
+    assert resolved.split_hours() == [
+        utc(2026, 9, 30, 18),
+        utc(2026, 10, 1, 18),
+        utc(2026, 10, 2, 18),
+    ]
+
+
+def test_kathmandu_hour_range_reads_every_hour_from_raw_clicks():
+    resolved = AnalyticsRange(
+        datetime(2026, 10, 1, 9), datetime(2026, 10, 1, 12), "hour", "Asia/Kathmandu"
+    ).resolve()
+
+    assert resolved.buckets() == [datetime(2026, 10, 1, hour) for hour in (9, 10, 11)]
+    assert resolved.split_hours() == [utc(2026, 10, 1, hour) for hour in (3, 4, 5, 6)]
+
+
+def test_kolkata_rounds_to_local_hours():
+    resolved = AnalyticsRange(
+        utc(2026, 10, 1, 10, 10), utc(2026, 10, 1, 11, 50), "hour", "Asia/Kolkata"
+    ).resolve()
+
+    # 15:40 and 17:20 in Kolkata (UTC+5:30), widened to 15:00 and 18:00
+    assert resolved.start == utc(2026, 10, 1, 9, 30)
+    assert resolved.end == utc(2026, 10, 1, 12, 30)
+    assert resolved.buckets() == [datetime(2026, 10, 1, hour) for hour in (15, 16, 17)]
+
+
+def test_kolkata_range_params():
+    resolved = AnalyticsRange(datetime(2026, 10, 1), datetime(2026, 10, 8), "week", "Asia/Kolkata").resolve()
+    params = range_params(resolved)
+
+    # 2026-10-01 is a Thursday, so the range touches two weeks
+    assert resolved.buckets() == [datetime(2026, 9, 28), datetime(2026, 10, 5)]
+    assert params["split_hours"] == [utc(2026, 9, 30, 18), utc(2026, 10, 4, 18), utc(2026, 10, 7, 18)]
+    # Only UTC days can be read from url_daily_stats
+    assert params["whole_start"] == params["whole_end"]
+    assert params["first_day"] == date(2026, 9, 30)
+    assert params["last_day"] == date(2026, 10, 7)
+    assert params["tz"] == "Asia/Kolkata"
+
+
+def test_whole_hour_zones_read_only_rollups():
+    resolved = AnalyticsRange(
+        datetime(2026, 10, 1, 6, 30), datetime(2026, 10, 4), "day", "UTC"
+    ).resolve()
+    params = range_params(resolved)
+
+    assert resolved.start == utc(2026, 10, 1, 6)
+    assert resolved.split_hours() == []
+    assert params["whole_start"] == utc(2026, 10, 2)
+    assert params["whole_end"] == utc(2026, 10, 4)
+
+    berlin = AnalyticsRange(datetime(2026, 10, 1), datetime(2026, 10, 3), "day", "Europe/Berlin").resolve()
+    assert berlin.split_hours() == []
+    assert berlin.end - berlin.start == timedelta(days=2)
@@ -1,4 +1,4 @@
-import { useQuery, useMutation, useQueryClient } from "@tanstack/react-query";
+import { useQuery, useInfiniteQuery, useMutation, useQueryClient } from "@tanstack/react-query";
 import { urlService } from "@/lib/urls";
 import type { URLCreate, URLUpdate } from "@/lib/types";
 
@@ -8,9 +8,11 @@ const GC_TIME = 10 * 60 * 1000; // 10 minutes
 const ANALYTICS_STALE_TIME = 60 * 1000; // 1 minute (analytics changes less frequently)
 
 export function useUrls(search?: string) {
-  return useQuery({
+  return useInfiniteQuery({
     queryKey: ["urls", search],
-    queryFn: () => urlService.getUrls(search),
+    queryFn: ({ pageParam }) => urlService.getUrls(search, pageParam),
+    initialPageParam: undefined as string | undefined,
+    getNextPageParam: (lastPage) => lastPage.next_cursor ?? undefined,
     staleTime: STALE_TIME,
     gcTime: GC_TIME,
   });
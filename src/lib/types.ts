@@ -119,6 +119,7 @@ export interface URLListResponse {
   urls: URLData[];
   total: number;
   total_clicks: number;
+  next_cursor: string | null;
 }
 
 export interface URLStats {
@@ -13,11 +13,12 @@ export const urlService = {
     return api.post<URLData>("/urls", data);
   },
 
-  async getUrls(search?: string): Promise<URLListResponse> {
-    const endpoint = search
-      ? `/urls?search=${encodeURIComponent(search)}`
-      : "/urls";
-    return api.get<URLListResponse>(endpoint);
+  async getUrls(search?: string, cursor?: string): Promise<URLListResponse> {
+    const params = new URLSearchParams();
+    if (search) params.set("search", search);
+    if (cursor) params.set("cursor", cursor);
+    const query = params.toString();
+    return api.get<URLListResponse>(query ? `/urls?${query}` : "/urls");
   },
 
   async getUrl(id: number): Promise<URLData> {
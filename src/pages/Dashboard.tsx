@@ -15,6 +15,9 @@ import { useUrls, useDeleteUrl, useUpdateUrl } from "@/hooks/useUrls";
 import { useDebounce } from "@/hooks/useDebounce";
 import type { URLData } from "@/lib/types";
 
+// The API rejects shorter searches (they can't use its trigram indexes)
+const MIN_SEARCH_LENGTH = 3;
+
 // Skeleton Components
 function StatsCardSkeleton() {
   return (
@@ -61,14 +64,24 @@ const Dashboard = () => {
   const [urlToDelete, setUrlToDelete] = useState<number | null>(null);
   
   // Debounce search query to reduce API calls
-  const debouncedSearch = useDebounce(searchQuery, 300);
+  const debouncedSearch = useDebounce(searchQuery, 300).trim();
+  const activeSearch = debouncedSearch.length >= MIN_SEARCH_LENGTH ? debouncedSearch : undefined;
   
-  const { data, isLoading, error } = useUrls(debouncedSearch || undefined);
+  const {
+    data,
+    isLoading,
+    error,
+    fetchNextPage,
+    hasNextPage,
+    isFetchingNextPage,
+  } = useUrls(activeSearch);
   const deleteUrl = useDeleteUrl();
   const updateUrl = useUpdateUrl();
 
-  const urls = data?.urls || [];
-  const totalClicks = data?.total_clicks || 0;
+  const urls = useMemo(() => data?.pages.flatMap((page) => page.urls) ?? [], [data]);
+  // Totals cover every page, not just the ones loaded so far
+  const totalLinks = data?.pages[0]?.total || 0;
+  const totalClicks = data?.pages[0]?.total_clicks || 0;
 
   const handleEdit = useCallback((url: URLData) => {
     setSelectedUrl(url);
@@ -173,7 +186,7 @@ const Dashboard = () => {
             <>
               <StatsCard
                 title="Total Links"
-                value={urls.length}
+                value={totalLinks}
                 icon={Link2}
               />
               <StatsCard
@@ -183,7 +196,7 @@ const Dashboard = () => {
               />
               <StatsCard
                 title="Active Links"
-                value={urls.length}
+                value={totalLinks}
                 icon={Globe}
               />
             </>
@@ -252,6 +265,19 @@ const Dashboard = () => {
           )}
         </div>
 
+        {/* Pagination */}
+        {hasNextPage && (
+          <div className="flex justify-center">
+            <Button
+              variant="outline"
+              onClick={() => fetchNextPage()}
+              disabled={isFetchingNextPage}
+            >
+              {isFetchingNextPage ? "Loading..." : "Load more"}
+            </Button>
+          </div>
+        )}
+
         {/* Edit Modal */}
         <EditURLModal
           open={editModalOpen}